@@ -0,0 +1,212 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from catalog_engine import (parse_catalog, render_catalog, catalog_stats, bundle_path, hash_file,
+                            DEDUP_POLICY, COMPRESS_THRESHOLD, BUNDLE_THRESHOLD)
+
+def find_inputs(patterns, output_dir=None):
+    """Expand directories and globs into (input_path, output_path) pairs"""
+    jobs = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            paths = glob.glob(os.path.join(pattern, '**', '*.txt'), recursive=True)
+        else:
+            root = None
+            paths = glob.glob(pattern, recursive=True)
+
+        for path in sorted(paths):
+            if not os.path.isfile(path):
+                continue
+            name = os.path.relpath(path, root) if root else os.path.basename(path)
+            name = os.path.splitext(name)[0] + '.html'
+            if output_dir:
+                output_path = os.path.join(output_dir, name)
+            else:
+                output_path = os.path.splitext(path)[0] + '.html'
+            jobs[os.path.abspath(path)] = output_path
+    return sorted(jobs.items())
+
+def find_collisions(jobs):
+    """Inputs that would write the same output, keyed by that output path"""
+    inputs = {}
+    for input_path, output_path in jobs:
+        inputs.setdefault(os.path.abspath(output_path), []).append(input_path)
+    return {output_path: paths for output_path, paths in inputs.items() if len(paths) > 1}
+
+def new_file_mode():
+    """Permissions open() would give a new file under the current umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def current_output(output_path):
+    """The newer of output_path and its bundle, or None when neither exists"""
+    paths = [path for path in (output_path, bundle_path(output_path)) if os.path.exists(path)]
+    return max(paths, key=os.path.getmtime, default=None)
+
+def convert_one(input_path, output_path, compress, dedupe=None, bundle=None):
+    """Convert one catalog, replacing the output atomically (runs inside a pool worker)
+    
+    Catalogs rendered as a split bundle go to bundle_path(output_path); the
+    stats name the file written as 'output'.
+    """
+    start = time.perf_counter()
+    parsed_data = parse_catalog(input_path, dedupe)
+
+    # Write next to the destination and rename, so readers never see a partial file
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            stats = render_catalog(parsed_data, f, compress, bundle)
+        # mkstemp creates the file owner-only; give it the usual mode instead
+        os.chmod(tmp_path, new_file_mode())
+        if stats.get('bundle_files'):
+            output_path = bundle_path(output_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    stats.update(catalog_stats(parsed_data))
+    stats['output'] = output_path
+    stats['input_bytes'] = os.path.getsize(input_path)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def load_state(path):
+    """Previously converted inputs: their output, render options and, with --check hash, content hash"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, state):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def render_options(args):
+    """Settings that shape an output, stored with its state entry"""
+    return {
+        'compress': args.compress,
+        'bundle': args.bundle,
+        'dedupe': args.dedupe,
+        # The auto modes depend on these
+        'compress_threshold': COMPRESS_THRESHOLD,
+        'bundle_threshold': BUNDLE_THRESHOLD,
+    }
+
+def is_unchanged(input_path, output_path, content_hash, state, options):
+    """True when the output is already up to date for this input
+    
+    Compares modification times, or the stored hash when content_hash is given.
+    An output rendered with other options than these is never up to date.
+    """
+    output_path = current_output(output_path)
+    if output_path is None:
+        return False
+    entry = state.get(input_path)
+    if entry and entry.get('options') != options:
+        return False
+    if content_hash is None:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    return bool(entry) and entry['output'] == os.path.abspath(output_path) and entry.get('hash') == content_hash
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert directories of catalog txt files to HTML viewers")
+    parser.add_argument('inputs', nargs='+', help="txt files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', help="write outputs here (default: next to each input)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--check', choices=('mtime', 'hash'), default='mtime',
+                        help="how to detect unchanged inputs (default: mtime)")
+    parser.add_argument('--state', default='.batch_state.json',
+                        help="file recording each output's options and, for --check hash, input hash")
+    parser.add_argument('--force', action='store_true', help="convert even unchanged inputs")
+    parser.add_argument('--compress', choices=('auto', 'always', 'never'), default='auto',
+                        help="embed the catalog gzip-compressed (default: above the size threshold)")
+    parser.add_argument('--bundle', choices=('auto', 'always', 'never'), default='auto',
+                        help="write a split .zip bundle instead of one HTML file (default: above the size threshold)")
+    parser.add_argument('--dedupe', choices=('first', 'merge', 'off'), default=DEDUP_POLICY,
+                        help="repeated URLs: keep the first entry, merge their titles, or keep all (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    compress = {'auto': None, 'always': True, 'never': False}[args.compress]
+    bundle = {'auto': None, 'always': True, 'never': False}[args.bundle]
+    options = render_options(args)
+    state = load_state(args.state)
+    jobs = find_inputs(args.inputs, args.output_dir)
+
+    # Inputs sharing a name would overwrite each other's output, so convert none of them
+    collisions = find_collisions(jobs)
+    for output_path, inputs in collisions.items():
+        print(f"❌ {output_path}: written by {len(inputs)} inputs ({', '.join(inputs)})")
+    clashing = sum(len(inputs) for inputs in collisions.values())
+    jobs = [job for job in jobs if os.path.abspath(job[1]) not in collisions]
+
+    todo = []
+    skipped = 0
+    hashes = {}
+    for input_path, output_path in jobs:
+        if args.check == 'hash':
+            hashes[input_path] = hash_file(input_path)
+        if not args.force and is_unchanged(input_path, output_path, hashes.get(input_path), state, options):
+            skipped += 1
+        else:
+            todo.append((input_path, output_path))
+
+    print(f"🎯 {len(jobs) + clashing} catalogs found, {len(todo)} to convert, {skipped} unchanged")
+
+    start = time.perf_counter()
+    totals = {'files': 0, 'failed': clashing, 'entries': 0, 'input_bytes': 0, 'output_bytes': 0}
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(convert_one, input_path, output_path, compress, args.dedupe, bundle): (input_path, output_path)
+            for input_path, output_path in todo
+        }
+        for future in as_completed(futures):
+            input_path, output_path = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                totals['failed'] += 1
+                print(f"❌ {input_path}: {e}")
+                continue
+
+            totals['files'] += 1
+            totals['entries'] += stats['videos'] + stats['pdfs']
+            totals['input_bytes'] += stats['input_bytes']
+            totals['output_bytes'] += stats['output_bytes']
+            print(f"✅ {stats['output']}  {stats['seconds'] * 1000:.0f} ms  "
+                  f"({stats['subjects']} subjects, {stats['videos']} videos, {stats['pdfs']} PDFs)")
+            state[input_path] = {
+                'hash': hashes.get(input_path),
+                'output': os.path.abspath(stats['output']),
+                'options': options
+            }
+
+    if todo:
+        save_state(args.state, state)
+
+    elapsed = time.perf_counter() - start
+    rate = elapsed or 1e-9
+    print("=" * 50)
+    print(f"📊 Converted {totals['files']} files in {elapsed:.2f}s ({totals['failed']} failed, {skipped} skipped)")
+    print(f"• {totals['files'] / rate:.1f} files/s")
+    print(f"• {totals['entries'] / rate:,.0f} entries/s")
+    print(f"• {totals['input_bytes'] / rate / 1024 / 1024:.1f} MB/s in, "
+          f"{totals['output_bytes'] / 1024 / 1024:.1f} MB written")
+    return 1 if totals['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from catalog_engine import parse_catalog, render_catalog
+
+SUBJECTS = [
+    'EVS', 'Hydraulics', 'Surveying', 'RCC Design', 'Soil Mechanics', 'Steel Structure',
+    'Transportation Engg', 'Building Materials', 'Estimating & Costing', 'Fluid Mechanics',
+    'Irrigation', 'Strength of Materials', 'Structural Analysis', 'Environmental Engg',
+    'Construction Management', 'Highway Engg', 'Railway Engg', 'Geotechnical Engg',
+    'Engineering Mechanics', 'Hindi व्याकरण', 'Reasoning', 'Current Affairs', 'Maths', 'English',
+]
+CATEGORIES = ['Theory', 'Practice', 'Notes', 'Revision', 'PYQ']
+
+def generate_catalog(path, lines, seed=1234):
+    """Write a deterministic synthetic (Category)Title:URL catalog
+
+    Subjects follow a Zipf-like skew, about half of the entries are Classplus
+    videos, a quarter PDFs, and a few lines are blank, malformed or untagged.
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(SUBJECTS))]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            subject = rng.choices(SUBJECTS, weights)[0]
+            category = rng.choice(CATEGORIES)
+            lect = rng.randint(1, 120)
+            kind = rng.random()
+            if kind < 0.5:
+                url = f"https://media-cdn.classplusapp.com/drm/{rng.getrandbits(64):016x}/master.m3u8"
+                line = f"({category})Lect-{lect} {subject} (Part {rng.randint(1, 4)}):{url}"
+            elif kind < 0.75:
+                url = f"https://cdn-wl-assets.classplus.co/production/single/{rng.getrandbits(48):012x}.pdf"
+                line = f"({category})Lect-{lect} {subject} Notes:{url}"
+            elif kind < 0.95:
+                url = f"https://d1.cdn.example.com/videos/{i}/index.m3u8?token={rng.getrandbits(32):08x}"
+                line = f"({category})Lect.{lect} {subject}:{url}"
+            elif kind < 0.98:
+                line = f"({category})Introduction {i}:https://youtu.be/{rng.getrandbits(40):010x}"
+            elif kind < 0.99:
+                line = ''
+            else:
+                line = f"Broken line {i} without a link"
+            f.write(line + '\n')
+
+def measure(func, *args, repeat=3):
+    """Best wall time of repeat calls, then peak traced memory of one more call
+
+    A single timing is too noisy to hold against the regression threshold.
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def run_case(lines, workdir, repeat=3):
+    """Benchmark parse and render for one catalog size"""
+    input_path = os.path.join(workdir, f'catalog_{lines}.txt')
+    output_path = os.path.join(workdir, f'catalog_{lines}.html')
+    generate_catalog(input_path, lines)
+
+    data, parse_seconds, parse_peak = measure(parse_catalog, input_path, repeat=repeat)
+    rendered, render_seconds, render_peak = measure(render_catalog, data, output_path, repeat=repeat)
+    entries = sum(len(s['videos']) + len(s['pdfs']) for f in data for s in f['subjects'])
+    return {
+        'lines': lines,
+        'entries': entries,
+        'input_bytes': os.path.getsize(input_path),
+        'parse_seconds': parse_seconds,
+        'parse_peak_bytes': parse_peak,
+        'render_seconds': render_seconds,
+        'render_peak_bytes': render_peak,
+        'output_bytes': rendered['output_bytes'],
+    }
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """Regressions of results against baseline, as readable messages"""
+    limits = {
+        'parse_seconds': time_threshold,
+        'render_seconds': time_threshold,
+        'parse_peak_bytes': memory_threshold,
+        'render_peak_bytes': memory_threshold,
+        'output_bytes': memory_threshold,
+    }
+    previous = {case['lines']: case for case in baseline.get('cases', [])}
+    regressions = []
+    for case in results['cases']:
+        base = previous.get(case['lines'])
+        if not base:
+            continue
+        for metric, limit in limits.items():
+            if base[metric] and case[metric] > base[metric] * (1 + limit):
+                change = case[metric] / base[metric] - 1
+                regressions.append(f"{case['lines']} lines: {metric} {base[metric]:.4g} → {case[metric]:.4g} (+{change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parse_catalog and render_catalog on synthetic catalogs")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="comma separated catalog sizes in lines (e.g. 1000,10000,100000,1000000)")
+    parser.add_argument('--output', default='bench_results.json', help="where to write results")
+    parser.add_argument('--baseline', default='bench_baseline.json', help="stored baseline to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per measurement, best one counts")
+    parser.add_argument('--time-threshold', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--memory-threshold', type=float, default=0.10, help="allowed memory/output growth")
+    args = parser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for lines in (int(size) for size in args.sizes.split(',')):
+            case = run_case(lines, workdir, args.repeat)
+            results['cases'].append(case)
+            print(f"📊 {lines:>9,} lines: "
+                  f"parse {case['parse_seconds']:.3f}s / {case['parse_peak_bytes'] / 1024 / 1024:.1f} MB, "
+                  f"render {case['render_seconds']:.3f}s / {case['render_peak_bytes'] / 1024 / 1024:.1f} MB, "
+                  f"output {case['output_bytes'] / 1024:,.0f} KB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.time_threshold, args.memory_threshold)
+    for message in regressions:
+        print(f"❌ Regression: {message}")
+    if not regressions:
+        print("✅ No regressions against baseline")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
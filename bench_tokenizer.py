@@ -0,0 +1,84 @@
+import re
+import sys
+import time
+import random
+import urllib.parse
+
+from catalog_engine import iter_entries
+
+def legacy_parse_line(line):
+    """Line parser as it was before the single-pass tokenizer (kept for comparison)"""
+    line = line.strip()
+    if not line:
+        return None
+
+    match = re.match(r'\(([^)]+)\)(.+?):(https?://.+)', line)
+    if not match:
+        return None
+
+    title = match.group(2).strip()
+    url = match.group(3).strip()
+
+    subject_match = re.search(r'(?:Lect[.-]?\d+\s+)(.+?)(?:\s*\(|$)', title)
+    if subject_match:
+        subject_name = subject_match.group(1).strip()
+    else:
+        subject_match = re.search(r'Lect[.-]?\d+\s+(.+)', title)
+        if subject_match:
+            subject_name = subject_match.group(1).strip()
+        else:
+            subject_name = "General"
+    subject_name = re.sub(r'\s+', ' ', subject_name)
+
+    category = match.group(1).strip()
+    if url.endswith('.pdf'):
+        return category, subject_name, 'pdfs', {'name': title, 'src': url, 'full_url': url}
+
+    drm = 'classplus' in match.group(3).lower()
+    if 'classplus' in url.lower():
+        url = f"https://engineers-babu.onrender.com/?url={urllib.parse.quote(url)}"
+    return category, subject_name, 'videos', {'title': title, 'src': url, 'drm': drm}
+
+def sample_lines(count, seed=42):
+    """Build a list of catalog lines in the shapes real uploads use"""
+    rng = random.Random(seed)
+    subjects = ['EVS', 'Hydraulics', 'Surveying', 'RCC Design', 'Soil Mechanics']
+    lines = []
+    for i in range(count):
+        subject = rng.choice(subjects)
+        lect = rng.randint(1, 60)
+        kind = rng.random()
+        if kind < 0.5:
+            lines.append(f"(Theory)Lect.-{lect} {subject} (Part {i % 4}):"
+                         f"https://media-cdn.classplusapp.com/drm/{i}/master.m3u8")
+        elif kind < 0.8:
+            lines.append(f"(Notes)Lect-{lect} {subject} Notes:"
+                         f"https://cdn-wl-assets.classplus.co/notes/{i}.pdf")
+        else:
+            lines.append(f"(Misc)Intro {i}:https://cdn.example.com/v/{i}.mp4")
+    return lines
+
+def lines_per_second(func, lines, repeat):
+    """Best-of-N throughput of func over lines"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = sample_lines(count)
+
+    legacy = [r for r in map(legacy_parse_line, lines) if r]
+    current = list(iter_entries(lines))
+    assert legacy == current, "tokenizer output differs from the legacy parser"
+
+    old_rate = lines_per_second(lambda ls: [legacy_parse_line(l) for l in ls], lines, 3)
+    new_rate = lines_per_second(lambda ls: list(iter_entries(ls)), lines, 3)
+
+    print(f"📊 Tokenizer benchmark ({count} lines)")
+    print(f"• Legacy parser:  {old_rate:,.0f} lines/s")
+    print(f"• Tokenizer:      {new_rate:,.0f} lines/s")
+    print(f"• Speedup:        {new_rate / old_rate:.2f}x")
@@ -0,0 +1,1862 @@
+"""Catalog parsing and HTML viewer rendering, shared by the bot and the offline tools
+
+parse_catalog() reads a (Category)Title:URL catalog from a path, bytes or a
+stream, render_catalog() writes the viewer for the parsed subjects to a path or
+a binary stream, and update_catalog() does both incrementally for the bot's
+workers. Only the standard library is imported, so scripts start quickly.
+"""
+import io
+import os
+import re
+import json
+import zlib
+import base64
+import time
+import hashlib
+import functools
+import itertools
+import urllib.parse
+import bz2
+import gzip
+import pickle
+import zipfile
+
+# Optional JSON list of extra URL rules (same shape as URL_RULES)
+URL_RULES_FILE = os.environ.get('URL_RULES_FILE', '')
+
+# What to do with entries whose URL already appeared: keep the 'first',
+# 'merge' their titles into the first one, or keep every copy ('off')
+DEDUP_POLICY = os.environ.get('DEDUP_POLICY', 'first')
+
+# Catalogs whose data blocks, as written into a single HTML file (packed when
+# large), exceed this many bytes are rendered as a zip of index.html plus
+# per-subject data files instead
+BUNDLE_THRESHOLD = int(os.environ.get('BUNDLE_THRESHOLD', str(16 * 1024 * 1024)))
+
+# Catalog payloads larger than this many bytes are embedded gzip-compressed
+COMPRESS_THRESHOLD = int(os.environ.get('COMPRESS_THRESHOLD', str(1024 * 1024)))
+
+# Number of characters read from an uploaded file at a time while parsing
+READ_CHUNK_SIZE = 64 * 1024
+
+# Lines longer than this many characters can't be catalog entries and are dropped
+MAX_LINE_LENGTH = 64 * 1024
+
+# Compressed uploads that inflate to more than this many bytes are rejected
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(256 * 1024 * 1024)))
+
+def iter_lines(f, chunk_size=READ_CHUNK_SIZE, max_length=MAX_LINE_LENGTH):
+    """Yield lines from a text stream, reading it in bounded chunks
+    
+    A line longer than max_length is yielded as '' once its end is found, so
+    neither memory nor line positions depend on how long it grows.
+    """
+    # Start of the current line, split across chunks
+    pieces = []
+    length = 0
+    for chunk in iter(lambda: f.read(chunk_size), ''):
+        first = chunk.find('\n')
+        if first < 0:
+            length += len(chunk)
+            if length <= max_length:
+                pieces.append(chunk)
+            else:
+                pieces = []
+            continue
+        length += first
+        yield ''.join(pieces) + chunk[:first] if length <= max_length else ''
+        last = chunk.rfind('\n')
+        if first < last:
+            lines = chunk[first + 1:last].split('\n')
+            if last - first > max_length:
+                lines = [line if len(line) <= max_length else '' for line in lines]
+            yield from lines
+        rest = chunk[last + 1:]
+        length = len(rest)
+        pieces = [rest] if length <= max_length else []
+    if length:
+        yield ''.join(pieces) if length <= max_length else ''
+
+# Precompiled patterns for the (Category)Title:URL line format
+LINE_RE = re.compile(r'\(([^)]+)\)(.+?):(https?://.+)')
+SUBJECT_RE = re.compile(r'Lect[.-]?\d+\s+(.+?)(?:\s*\(|$)')
+
+@functools.lru_cache(maxsize=4096)
+def _subject_from_prefix(prefix):
+    """Extract the subject from the part of a title before its first '('"""
+    match = SUBJECT_RE.search(prefix)
+    if not match:
+        return None
+    # An empty capture means the marker runs into the '(' - let the caller decide
+    return ' '.join(match.group(1).split()) or None
+
+def extract_subject(title):
+    """Return the subject name for a lecture title (e.g. "Lect.-1 EVS" -> "EVS")"""
+    paren = title.find('(')
+    subject = _subject_from_prefix(title if paren < 0 else title[:paren])
+    if subject is None and paren >= 0:
+        # Lecture marker runs into or sits inside the parentheses
+        match = SUBJECT_RE.search(title)
+        if match:
+            subject = ' '.join(match.group(1).split())
+    return "General" if subject is None else subject
+
+def tokenize_line(line):
+    """Split a catalog line into (category, title, url, subject) in one pass"""
+    match = LINE_RE.match(line)
+    if not match:
+        return None
+    category, title, url = match.groups()
+    title = title.strip()
+    return category.strip(), title, url.strip(), extract_subject(title)
+
+CLASSPLUS_PROXY = 'https://engineers-babu.onrender.com/?url='
+
+# URL rules: 'match' is a host suffix (subdomains included) or a path extension,
+# 'kind' the entry it makes, and 'proxy'/'drm' how matching URLs are rewritten.
+# Extension rules decide the kind first, so a Classplus PDF stays a plain PDF link.
+URL_RULES = [
+    {'match': '.pdf', 'kind': 'pdfs'},
+    {'match': 'classplusapp.com', 'kind': 'videos', 'proxy': CLASSPLUS_PROXY, 'drm': True},
+    {'match': 'classplus.co', 'kind': 'videos', 'proxy': CLASSPLUS_PROXY, 'drm': True},
+]
+
+# Host and path of a URL in one match; the query string and fragment are left out
+URL_PARTS_RE = re.compile(r'[^:/?#]+://(?:[^@/?#]*@)?([^:/?#]*)[^/?#]*([^?#]*)')
+
+# Characters urllib.parse.quote escapes in ASCII text, with their escapes
+_UNSAFE_RE = re.compile(r'[^A-Za-z0-9_.\-~/]')
+_ESCAPES = {chr(c): f'%{c:02X}' for c in range(128)}
+
+def quote_url(url):
+    """Percent-encode url like urllib.parse.quote, without its per-call overhead for ASCII"""
+    if url.isascii():
+        return _UNSAFE_RE.sub(lambda m: _ESCAPES[m.group()], url)
+    return urllib.parse.quote(url)
+
+class UrlRules:
+    """URL rules compiled into dict lookups by host suffix and by extension
+    
+    Classifying a URL costs one regex match plus a lookup per host label,
+    however many rules there are.
+    """
+    
+    def __init__(self, rules):
+        self.hosts = {}
+        self.extensions = {}
+        self._host_cache = {}
+        for rule in rules:
+            if rule.get('kind') not in ('videos', 'pdfs'):
+                raise ValueError(f"URL rule {rule.get('match')!r} needs kind 'videos' or 'pdfs'")
+            match = rule['match'].lower()
+            # Later rules override earlier ones for the same pattern
+            if match.startswith('.'):
+                self.extensions[match] = rule
+            else:
+                self.hosts[match] = rule
+    
+    def host_rule(self, host):
+        """Rule of the longest host suffix that has one"""
+        try:
+            return self._host_cache[host]
+        except KeyError:
+            pass
+        if len(self._host_cache) >= 4096:
+            self._host_cache.clear()
+        rule = self._host_cache[host] = self._match_host(host.lower())
+        return rule
+    
+    def _match_host(self, host):
+        while True:
+            rule = self.hosts.get(host)
+            if rule is not None:
+                return rule
+            dot = host.find('.')
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+    
+    def classify(self, url):
+        """Return (kind, src, drm) for a catalog URL"""
+        match = URL_PARTS_RE.match(url)
+        host_rule = extension_rule = None
+        if match:
+            host, path = match.groups()
+            if host:
+                host_rule = self.host_rule(host)
+            dot = path.rfind('.')
+            if dot > path.rfind('/'):
+                extension_rule = self.extensions.get(path[dot:].lower())
+        
+        kind = (extension_rule or host_rule or {}).get('kind', 'videos')
+        # Rewrites come from the host rule unless it disagrees about the kind
+        rule = host_rule if host_rule and host_rule['kind'] == kind else extension_rule
+        if rule is None:
+            return kind, url, False
+        src = rule['proxy'] + quote_url(url) if rule.get('proxy') else url
+        return kind, src, bool(rule.get('drm'))
+
+def load_url_rules(path):
+    """Built-in URL rules followed by those in a JSON file, if one is configured"""
+    rules = list(URL_RULES)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            rules.extend(json.load(f))
+    return UrlRules(rules)
+
+url_rules = load_url_rules(URL_RULES_FILE)
+
+def iter_entries(lines):
+    """Yield (category, subject, kind, entry) records parsed from catalog lines"""
+    for line in lines:
+        tokens = tokenize_line(line.strip())
+        if tokens is None:
+            continue
+        category, title, url, subject_name = tokens
+        category = category or "General"
+        
+        # Video or PDF, with Classplus URLs routed through the API
+        kind, url, drm = url_rules.classify(url)
+        if kind == 'pdfs':
+            yield category, subject_name, 'pdfs', {
+                'name': title,
+                'src': url,
+                'full_url': url  # Keep original URL for opening in new tab
+            }
+            continue
+        
+        yield category, subject_name, 'videos', {
+            'title': title,
+            'src': url,
+            'drm': drm
+        }
+
+class Deduplicator:
+    """Drop parsed records whose URL was already seen, keyed on the rewritten src
+    
+    With the 'merge' policy the titles of dropped copies are appended to the
+    first entry's title instead of being lost. Counts what it removed.
+    """
+    
+    def __init__(self, policy='first'):
+        self.policy = policy
+        self.seen = {}
+        self.removed = 0
+    
+    def add_existing(self, tree):
+        """Register entries already merged into a category tree"""
+        for subjects in tree.values():
+            for content in subjects.values():
+                for kind in ('videos', 'pdfs'):
+                    for entry in content[kind]:
+                        self.seen.setdefault(entry['src'], entry)
+    
+    def filter(self, entries):
+        """Yield the records of entries that are not duplicates"""
+        if self.policy == 'off':
+            yield from entries
+            return
+        seen = self.seen
+        for record in entries:
+            entry = record[3]
+            first = seen.get(entry['src'])
+            if first is None:
+                seen[entry['src']] = entry
+                yield record
+                continue
+            self.removed += 1
+            if self.policy == 'merge':
+                field = 'title' if record[2] == 'videos' else 'name'
+                title = entry[field]
+                if title not in first[field].split(' | '):
+                    first[field] += ' | ' + title
+
+def merge_entries(tree, entries):
+    """Append parsed records to a {category: {subject: {'videos', 'pdfs'}}} tree in place"""
+    for category, subject_name, kind, entry in entries:
+        subjects = tree.get(category)
+        if subjects is None:
+            subjects = tree[category] = {}
+        
+        # Initialize subject if not exists
+        content = subjects.get(subject_name)
+        if content is None:
+            content = subjects[subject_name] = {
+                'videos': [],
+                'pdfs': []
+            }
+        
+        # Add to appropriate list
+        content[kind].append(entry)
+    
+    return tree
+
+def build_groups(tree):
+    """Convert the category tree to the folder list the viewer expects"""
+    result = []
+    for category, subjects in tree.items():
+        folder = {'folder': category, 'subjects': []}
+        for subject_name, content in subjects.items():
+            if content['videos'] or content['pdfs']:
+                folder['subjects'].append({
+                    'name': subject_name,
+                    'videos': content['videos'],
+                    'pdfs': content['pdfs']
+                })
+        if folder['subjects']:
+            result.append(folder)
+    
+    return result
+
+def group_entries(entries, dedupe=None):
+    """Group parsed records by subject as they arrive, dropping duplicate URLs per the dedupe policy"""
+    return build_groups(merge_entries({}, Deduplicator(dedupe or DEDUP_POLICY).filter(entries)))
+
+def parse_catalog(source, dedupe=None, compression=None):
+    """Parse a catalog from a file path, bytes or a file object into subjects with videos and PDFs
+    
+    Binary sources are decoded as UTF-8, after being decompressed as a stream
+    when compression ('gzip', 'bz2' or 'zip', see upload_format) is set; text
+    streams are read as they are. A file object passed in is left open.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        # Stream the file so memory grows with the entries kept, not the upload size
+        with open(source, 'rb') as f:
+            return parse_catalog(f, dedupe, compression)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return parse_catalog(io.BytesIO(source), dedupe, compression)
+    if isinstance(source, io.TextIOBase):
+        return group_entries(iter_entries(iter_lines(source)), dedupe)
+    if compression:
+        texts = iter_archive_texts(source, compression, {})
+        return group_entries(iter_entries(itertools.chain.from_iterable(iter_lines(f) for f in texts)), dedupe)
+    text = io.TextIOWrapper(source, encoding='utf-8')
+    try:
+        return group_entries(iter_entries(iter_lines(text)), dedupe)
+    finally:
+        # Hand the binary stream back to the caller instead of closing it
+        text.detach()
+
+HTML_SHELL = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Engineers Babu | HTML Viewer</title>
+
+<style>
+/* ================= THEME VARIABLES ================= */
+:root {
+  /* 🌙 DARK THEME */
+  --page-bg:#0f1117;
+  --card-bg:#161b22;
+  --inner-bg:#1f2633;
+  --text:#e5e7eb;
+  --muted:#9ca3af;
+  --border:rgba(255,255,255,0.08);
+  --shadow:none;
+  --primary:#2563eb;
+}
+
+.light {
+  /* ☀️ LIGHT THEME */
+  --page-bg:#f4f6fb;
+  --card-bg:#ffffff;
+  --inner-bg:#f1f4fb;
+  --text:#1f2937;
+  --muted:#6b7280;
+  --border:rgba(0,0,0,0.06);
+  --shadow:0 8px 24px rgba(0,0,0,0.05);
+  --primary:#2563eb;
+}
+
+/* ================= BASE ================= */
+* {
+  margin:0;
+  padding:0;
+  box-sizing:border-box;
+  font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto;
+}
+
+body {
+  background:var(--page-bg);
+  color:var(--text);
+  transition:background .3s,color .3s;
+}
+
+/* ================= HEADER ================= */
+.main-header {
+  position:relative;
+  display:flex;
+  justify-content:flex-end;
+  align-items:center;
+  padding:18px 20px;
+  background:var(--card-bg);
+  border-bottom:1px solid var(--border);
+}
+
+.title-box {
+  position:absolute;
+  left:50%;
+  transform:translateX(-50%);
+  text-align:center;
+}
+
+.title-box h1 {
+  font-size:42px;
+  font-weight:800;
+  background:linear-gradient(90deg,#00f5ff,#E50914,#ffcc00);
+  -webkit-background-clip:text;
+  -webkit-text-fill-color:transparent;
+  letter-spacing:2px;
+}
+
+.title-box span {
+  font-size:13px;
+  color:var(--muted);
+  letter-spacing:3px;
+}
+
+.toggle {
+  cursor:pointer;
+  padding:8px 14px;
+  border-radius:20px;
+  background:var(--inner-bg);
+  border:1px solid var(--border);
+}
+
+/* ===== GRADIENT LINE ===== */
+.gradient-bar {
+  height:6px;
+  background:linear-gradient(
+    90deg,
+    #00f5ff,
+    #7a00ff,
+    #E50914,
+    #ffcc00
+  );
+}
+
+/* ================= SEARCH ================= */
+.search {
+  padding:14px;
+}
+
+.search input {
+  width:100%;
+  padding:12px;
+  border-radius:12px;
+  border:none;
+  outline:none;
+  background:var(--card-bg);
+  color:var(--text);
+  box-shadow:var(--shadow);
+}
+
+#searchResults {
+  max-height:260px;
+  overflow-y:auto;
+}
+
+.search-result {
+  margin-top:6px;
+  padding:10px 12px;
+  border-radius:10px;
+  background:var(--card-bg);
+  cursor:pointer;
+  white-space:nowrap;
+  overflow:hidden;
+  text-overflow:ellipsis;
+}
+
+.search-result small {
+  margin-left:6px;
+  color:var(--muted);
+}
+
+.search-result:hover {
+  background:var(--primary);
+  color:#fff;
+}
+
+/* ================= LAYOUT ================= */
+.container {
+  display:grid;
+  grid-template-columns:280px 1fr 360px;
+  gap:18px;
+  padding:18px;
+}
+
+/* ================= CARD ================= */
+.card {
+  background:var(--card-bg);
+  border-radius:18px;
+  padding:14px;
+  border:1px solid var(--border);
+  box-shadow:var(--shadow);
+  display:flex;
+  flex-direction:column;
+}
+
+.card h3 {
+  margin-bottom:12px;
+  font-size:18px;
+  font-weight:600;
+}
+
+/* ================= SUBJECTS ================= */
+.folder-title {
+  padding:12px;
+  border-radius:12px;
+  background:var(--inner-bg);
+  font-weight:600;
+  cursor:pointer;
+  margin-bottom:8px;
+}
+
+.subject {
+  margin-top:6px;
+  padding:10px;
+  border-radius:10px;
+  background:var(--inner-bg);
+  cursor:pointer;
+  transition:all 0.2s;
+}
+
+.subject:hover,
+.subject.active {
+  background:var(--primary);
+  color:#fff;
+  transform:translateX(4px);
+}
+
+/* ================= VIDEO PLAYER SECTION ================= */
+#videoPlayer {
+  flex:1;
+  display:flex;
+  flex-direction:column;
+  min-height:400px;
+}
+
+#videoPlayerContainer {
+  flex:1;
+  background:var(--inner-bg);
+  border-radius:14px;
+  overflow:hidden;
+  display:flex;
+  align-items:center;
+  justify-content:center;
+  border:1px solid var(--border);
+  margin-bottom:12px;
+}
+
+/* Fixed API Player Container - NO SCROLLING */
+.api-player-container {
+  width:100%;
+  height:100%;
+  min-height:360px;
+  background:#000;
+  position:relative;
+  display:flex;
+  align-items:center;
+  justify-content:center;
+  overflow:hidden !important;
+}
+
+.api-player-iframe {
+  width:100%;
+  height:100%;
+  border:none;
+  background:#000;
+  overflow:hidden !important;
+}
+
+/* PLAYLIST SECTION */
+#playlistContainer {
+  flex:1;
+  overflow-y:auto;
+  max-height:300px;
+  padding-right:4px;
+}
+
+.playlist-item {
+  height:40px;
+  padding:10px;
+  border-radius:10px;
+  background:var(--inner-bg);
+  cursor:pointer;
+  margin-bottom:6px;
+  transition:all 0.2s;
+  display:flex;
+  align-items:center;
+  gap:8px;
+}
+
+.playlist-item:before {
+  content:"▶";
+  font-size:12px;
+  opacity:0.7;
+}
+
+.playlist-item:hover,
+.playlist-item.active {
+  background:var(--primary);
+  color:#fff;
+  transform:translateX(4px);
+}
+
+.playlist-item.active:before {
+  content:"⏸";
+}
+
+/* ================= PDF SECTION ================= */
+#pdfContainer {
+  flex:1;
+  display:flex;
+  flex-direction:column;
+  min-height:400px;
+}
+
+#pdfList {
+  flex:1;
+  overflow-y:auto;
+  max-height:350px;
+  padding-right:4px;
+}
+
+.pdf-item {
+  height:40px;
+  padding:10px;
+  border-radius:10px;
+  background:var(--inner-bg);
+  cursor:pointer;
+  margin-bottom:6px;
+  transition:all 0.2s;
+  display:flex;
+  align-items:center;
+  gap:8px;
+}
+
+.pdf-item:before {
+  content:"📄";
+  font-size:14px;
+}
+
+.pdf-item:hover,
+.pdf-item.active {
+  background:var(--primary);
+  color:#fff;
+  transform:translateX(4px);
+}
+
+/* ================= RESPONSIVE ================= */
+@media(max-width:900px) {
+  .container {
+    grid-template-columns:1fr;
+  }
+  #videoPlayerContainer {
+    min-height:300px;
+  }
+  .api-player-container {
+    min-height:300px;
+  }
+}
+
+@media(max-width:600px) {
+  #videoPlayerContainer {
+    min-height:250px;
+  }
+  .api-player-container {
+    min-height:250px;
+  }
+}
+
+/* Scrollbar Styling */
+::-webkit-scrollbar {
+  width:6px;
+}
+
+::-webkit-scrollbar-track {
+  background:transparent;
+  border-radius:3px;
+}
+
+::-webkit-scrollbar-thumb {
+  background:var(--primary);
+  border-radius:3px;
+}
+
+::-webkit-scrollbar-thumb:hover {
+  background:var(--primary);
+  opacity:0.8;
+}
+</style>
+</head>
+
+<body class="light">
+
+<header class="main-header">
+  <div class="title-box">
+    <h1>Engineers Babu</h1>
+    <span>HTML VIEWER</span>
+  </div>
+  <div class="toggle" onclick="toggleTheme()">🌙 / ☀️</div>
+</header>
+
+<div class="gradient-bar"></div>
+
+<div class="search">
+  <input type="text" placeholder="Search subjects, lectures and PDFs..." oninput="onSearchInput(this.value)">
+  <div id="searchResults"></div>
+</div>
+
+<div class="container">
+
+  <!-- LEFT - SUBJECTS -->
+  <div class="card" id="subjectsCard">
+    <h3>📚 Subjects</h3>
+    <div id="subjects"></div>
+  </div>
+
+  <!-- CENTER - VIDEO PLAYER -->
+  <div class="card" id="videoCard">
+    <h3>🎬 Video Player</h3>
+    <div id="videoPlayer">
+      <div id="videoPlayerContainer">
+        <div class="api-player-container">
+          <iframe class="api-player-iframe" 
+                  id="apiPlayer" 
+                  allowfullscreen
+                  allow="autoplay; encrypted-media; picture-in-picture">
+          </iframe>
+        </div>
+      </div>
+      <div id="playlistContainer">
+        <div id="playlist"></div>
+      </div>
+    </div>
+  </div>
+
+  <!-- RIGHT - PDF LIST -->
+  <div class="card" id="pdfCard">
+    <h3>📄 PDF Files</h3>
+    <div id="pdfContainer">
+      <div id="pdfList"></div>
+      <div style="margin-top:15px; padding:12px; background:var(--inner-bg); border-radius:10px; font-size:14px; color:var(--muted);">
+        <p>📌 <strong>Note:</strong> Click on any PDF to open it in a new tab</p>
+      </div>
+    </div>
+  </div>
+
+</div>
+
+<!-- Catalog data: one block per subject, parsed only when the subject is opened -->
+/*BLOCKS*/
+<script>
+/* ================= THEME TOGGLE ================= */
+function toggleTheme() {
+  document.body.classList.toggle("light");
+  const toggleBtn = document.querySelector('.toggle');
+  toggleBtn.textContent = document.body.classList.contains('light') ? '🌙' : '☀️';
+}
+
+/* ================= DATA ================= */
+// Subject manifest: names, item counts and the data block holding each subject
+const data = /*DATA*/;
+const blockCache = {};
+
+async function inflateData(packed) {
+  // Block was gzip-compressed and base64-encoded to shrink the file
+  const bytes = Uint8Array.from(atob(packed), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return JSON.parse(await new Response(stream).text());
+}
+
+function readBlock(id) {
+  // Parse a data block the first time it is needed, then reuse it
+  if (!blockCache[id]) {
+    const block = document.getElementById(id);
+    if (!block) {
+      blockCache[id] = loadFragment(id);
+    } else {
+      blockCache[id] = block.type === 'application/json'
+        ? Promise.resolve(JSON.parse(block.textContent))
+        : inflateData(block.textContent);
+    }
+  }
+  return blockCache[id];
+}
+
+/* ================= SPLIT BUNDLES ================= */
+// Large catalogs ship as index.html plus data/<block>.js files; script tags
+// load them even from file:// pages, where fetch() is not allowed
+const fragmentWaiters = {};
+
+function loadFragment(id) {
+  return new Promise((resolve, reject) => {
+    fragmentWaiters[id] = resolve;
+    const script = document.createElement('script');
+    script.src = 'data/' + id + '.js';
+    script.onerror = () => reject(new Error('Missing data/' + id + '.js'));
+    document.head.appendChild(script);
+  });
+}
+
+function catalogBlock(id, payload) {
+  // Called by each fragment file as it loads
+  const resolve = fragmentWaiters[id];
+  delete fragmentWaiters[id];
+  if (resolve) resolve(payload);
+}
+
+/* ================= COMPACT BLOCKS ================= */
+// Subject blocks are columnar: titles and URL suffixes in parallel arrays, URLs
+// split off a shared prefix table, and strings repeated within a block replaced
+// by their number in order of first appearance
+const subjectCache = {};
+
+function unpackInts(packed) {
+  // Inverse of pack_ints: base-32 digits, ';'..'Z' leading and ']'..'|' ending each number
+  const values = [];
+  let n = 0;
+  for (let i = 0; i < packed.length; i++) {
+    const c = packed.charCodeAt(i);
+    if (c < 93) {
+      n = n * 32 + c - 59;
+    } else {
+      values.push(n * 32 + c - 93);
+      n = 0;
+    }
+  }
+  return values;
+}
+
+function lazyList(count, build) {
+  // Array-like list whose rows are built when first read, so opening a subject
+  // does not create an object for every item
+  return new Proxy(new Array(count), {
+    get(rows, key) {
+      const i = typeof key === 'string' ? Number(key) : NaN;
+      if (Number.isInteger(i) && i >= 0 && i < count) return rows[i] || (rows[i] = build(i));
+      return Reflect.get(rows, key);
+    }
+  });
+}
+
+function decodeSubject(block, prefixes) {
+  // Nothing is unpacked until the first row is read
+  let strings = null, videoRefs = null, pdfRefs = null;
+  const text = s => {
+    if (typeof s === 'string') return s;
+    if (!strings) {
+      // Strings are numbered in order of first appearance, reading v, vs, p, ps
+      strings = [];
+      for (const column of [block.v, block.vs, block.p, block.ps]) {
+        for (const value of column) if (typeof value === 'string') strings.push(value);
+      }
+    }
+    return strings[s];
+  };
+  const fullUrls = block.pf || {};
+  return {
+    videos: lazyList(block.v.length, i => {
+      videoRefs = videoRefs || unpackInts(block.vp);
+      return {
+        title: text(block.v[i]),
+        src: prefixes[videoRefs[i]] + text(block.vs[i]),
+        drm: block.vd[i] === '1'
+      };
+    }),
+    pdfs: lazyList(block.p.length, i => {
+      pdfRefs = pdfRefs || unpackInts(block.pp);
+      const src = prefixes[pdfRefs[i]] + text(block.ps[i]);
+      return { name: text(block.p[i]), src, full_url: fullUrls[i] || src };
+    })
+  };
+}
+
+function subjectData(sub) {
+  // Decode a subject the first time it is opened; the raw block is then dropped
+  if (!subjectCache[sub.block]) {
+    const id = 'subject-' + sub.block;
+    subjectCache[sub.block] = Promise.all([readBlock(id), readBlock('url-prefixes')]).then(([block, prefixes]) => {
+      delete blockCache[id];
+      return decodeSubject(block, prefixes);
+    });
+  }
+  return subjectCache[sub.block];
+}
+
+/* ================= VARIABLES ================= */
+// Items are looked up by index into these arrays instead of being inlined in the DOM
+let currentSubject = null;
+let currentVideo = null;
+let activeIndex = -1;
+let activeSubjectEl = null;
+let playlistView = null;
+
+/* ================= VIRTUAL LISTS ================= */
+// Rows have a fixed height (40px + 6px margin) so positions can be computed
+const ROW_HEIGHT = 46;
+const OVERSCAN = 6;
+
+function virtualList(scroller, host, items, renderRow) {
+  // Only the visible rows plus overscan exist in the DOM, however long the list
+  host.innerHTML = `<div style="position:relative;height:${items.length * ROW_HEIGHT}px"><div style="position:absolute;left:0;right:0;top:0"></div></div>`;
+  const rows = host.firstChild.firstChild;
+  let first = -1, last = -1;
+  
+  function update(force) {
+    const top = scroller.scrollTop;
+    const start = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+    const end = Math.min(items.length, Math.ceil((top + scroller.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+    if (!force && start === first && end === last) return;
+    first = start;
+    last = end;
+    let html = '';
+    for (let i = start; i < end; i++) {
+      html += renderRow(items[i], i);
+    }
+    rows.style.top = (start * ROW_HEIGHT) + 'px';
+    rows.innerHTML = html;
+  }
+  
+  scroller.onscroll = () => update(false);
+  scroller.scrollTop = 0;
+  update(true);
+  return {
+    // Rendered element for item i, or null when it is scrolled out of view
+    row: i => (i >= first && i < last ? rows.children[i - first] : null),
+    scrollTo: i => {
+      scroller.scrollTop = i * ROW_HEIGHT;
+      update(false);
+    }
+  };
+}
+
+/* ================= SUBJECTS RENDERING ================= */
+// "fi:si" keys of the subjects matching the current search, or null when not searching
+let visibleSubjects = null;
+
+function renderSubjects() {
+  // Only category folders are rendered up front; their subjects are added on first expand
+  let html = "";
+  data.forEach((f, fi) => {
+    html += `
+      <div class="folder-title" data-folder="${fi}">
+        📁 ${f.folder} <small>(${f.subjects.length})</small>
+      </div>
+      <div style="display:none;padding-left:6px;"></div>
+    `;
+  });
+  subjects.innerHTML = html;
+}
+
+function folderContent(fi) {
+  // Children container of folder fi, filled with its subjects the first time
+  const content = subjects.querySelector(`.folder-title[data-folder="${fi}"]`).nextElementSibling;
+  if (!content.dataset.loaded) {
+    let html = "";
+    data[fi].subjects.forEach((s, si) => {
+      const hidden = visibleSubjects && !visibleSubjects.has(fi + ':' + si) ? ' style="display:none"' : '';
+      html += `<div class="subject" data-folder="${fi}" data-subject="${si}"${hidden}>${s.name}</div>`;
+    });
+    content.innerHTML = html;
+    content.dataset.loaded = '1';
+  }
+  return content;
+}
+
+function toggleFolder(element) {
+  const content = folderContent(element.dataset.folder);
+  content.style.display = content.style.display === 'block' ? 'none' : 'block';
+}
+
+/* ================= LOAD SUBJECT ================= */
+async function loadSubject(sub, el) {
+  // Highlight selected subject
+  if (activeSubjectEl) {
+    activeSubjectEl.classList.remove("active");
+  }
+  activeSubjectEl = el;
+  el.classList.add("active");
+  
+  try {
+    sub = await subjectData(sub);
+  } catch (err) {
+    document.getElementById('playlist').innerHTML = '<div style="padding:20px;text-align:center;color:var(--muted)">⚠️ This subject could not be loaded. Extract the whole .zip before opening index.html, or update your browser.</div>';
+    return;
+  }
+  if (activeSubjectEl !== el) return;  // another subject was clicked meanwhile
+  currentSubject = sub;
+  activeIndex = -1;
+  
+  // Load videos if available
+  if (sub.videos && sub.videos.length > 0) {
+    renderPlaylist(sub.videos);
+    playVideo(0);
+  } else {
+    document.getElementById('apiPlayer').src = '';
+    playlistView = null;
+    document.getElementById('playlist').innerHTML = '<div style="padding:20px;text-align:center;color:var(--muted)">No videos available</div>';
+  }
+  
+  // Load PDFs if available
+  if (sub.pdfs && sub.pdfs.length > 0) {
+    renderPdfs(sub.pdfs);
+  } else {
+    document.getElementById('pdfList').innerHTML = '<div style="padding:20px;text-align:center;color:var(--muted)">No PDFs available</div>';
+  }
+}
+
+/* ================= VIDEO PLAYER FUNCTIONS ================= */
+function playVideo(index) {
+  const video = currentSubject.videos[index];
+  currentVideo = video;
+  
+  // Set iframe source
+  const apiPlayer = document.getElementById('apiPlayer');
+  apiPlayer.src = video.src;
+  
+  // Highlight the clicked video in playlist
+  highlightPlaylistItem(index);
+  
+  // Scroll video section into view
+  document.getElementById('videoCard').scrollIntoView({
+    behavior: 'smooth',
+    block: 'start'
+  });
+}
+
+function renderPlaylist(videos) {
+  const scroller = document.getElementById('playlistContainer');
+  playlistView = virtualList(scroller, document.getElementById('playlist'), videos, (v, index) => `
+      <div class="playlist-item${index === activeIndex ? ' active' : ''}" data-index="${index}">
+        <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;">
+          ${v.title}
+        </span>
+      </div>
+    `);
+}
+
+function highlightPlaylistItem(index) {
+  // Only the previous and the new row change; off-screen rows pick it up when rendered
+  const previous = playlistView.row(activeIndex);
+  if (previous) {
+    previous.classList.remove("active");
+  }
+  activeIndex = index;
+  const row = playlistView.row(index);
+  if (row) {
+    row.classList.add("active");
+  }
+}
+
+/* ================= PDF FUNCTIONS ================= */
+function renderPdfs(pdfs) {
+  const pdfList = document.getElementById('pdfList');
+  virtualList(pdfList, pdfList, pdfs, (pdf, index) => `
+      <div class="pdf-item" data-index="${index}">
+        <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;">
+          ${pdf.name}
+        </span>
+      </div>
+    `);
+}
+
+function openPdf(url) {
+  // Open PDF in new tab
+  window.open(url, '_blank');
+}
+
+/* ================= CLICK HANDLING ================= */
+// One delegated listener per list; rows carry only their indexes
+subjects.addEventListener('click', e => {
+  const folder = e.target.closest('.folder-title');
+  if (folder) {
+    toggleFolder(folder);
+    return;
+  }
+  const item = e.target.closest('.subject');
+  if (item) {
+    loadSubject(data[item.dataset.folder].subjects[item.dataset.subject], item);
+  }
+});
+
+document.getElementById('playlist').addEventListener('click', e => {
+  const item = e.target.closest('.playlist-item');
+  if (item) {
+    playVideo(Number(item.dataset.index));
+  }
+});
+
+document.getElementById('pdfList').addEventListener('click', e => {
+  const item = e.target.closest('.pdf-item');
+  if (item) {
+    const pdf = currentSubject.pdfs[item.dataset.index];
+    openPdf(pdf.full_url || pdf.src);
+  }
+});
+
+/* ================= SEARCH FUNCTION ================= */
+const SEARCH_LIMIT = 50;
+const SEARCH_DELAY = 150;
+// Catalogs with more items than this are searched in a Web Worker
+const WORKER_SEARCH_MIN = 50000;
+
+let itemStarts = [];   // first item number of each subject, in catalog order
+let subjectRefs = [];  // [folder, subject] index pair for each entry of itemStarts
+let searchIndex = null;
+let searchWorker = null;
+let searchReady = null;
+let searchSeq = 0;
+let searchTimer = null;
+
+function searchCore(index, query) {
+  // Must match TOKEN_RE in the generator: runs of anything but whitespace and ASCII punctuation
+  const terms = query.toLowerCase().match(/[^\\s!-\\/:-@\\[-`{-~]+/g);
+  if (!terms) return null;
+  let result = null;
+  for (const term of terms) {
+    // Tokens are sorted, so every token starting with term sits in one run
+    let lo = 0, hi = index.tokens.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (index.tokens[mid] < term) lo = mid + 1; else hi = mid;
+    }
+    const ids = new Set();
+    for (let t = lo; t < index.tokens.length && index.tokens[t].startsWith(term); t++) {
+      let id = 0;
+      for (const delta of unpackInts(index.postings[t])) {
+        id += delta;
+        if (!result || result.has(id)) ids.add(id);
+      }
+    }
+    result = ids;
+    if (!result.size) break;
+  }
+  return Array.from(result).sort((a, b) => a - b);
+}
+
+function prepareSearch() {
+  let item = 0;
+  data.forEach((f, fi) => f.subjects.forEach((s, si) => {
+    itemStarts.push(item);
+    subjectRefs.push([fi, si]);
+    item += s.videoCount + s.pdfCount;
+  }));
+}
+
+function loadSearchIndex() {
+  // The index is only parsed once the user starts searching; searches started
+  // while it loads share the one load, so only one worker is ever created
+  searchReady = searchReady || (async () => {
+    searchIndex = await readBlock('search-index');
+    
+    if (window.Worker && searchIndex.count > WORKER_SEARCH_MIN) {
+      try {
+        const source = `${unpackInts.toString()}
+          ${searchCore.toString()}
+          let index = null;
+          onmessage = e => {
+            if (e.data.index) { index = e.data.index; return; }
+            postMessage({ seq: e.data.seq, query: e.data.query, ids: searchCore(index, e.data.query) });
+          };`;
+        searchWorker = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+        searchWorker.onmessage = e => showResults(e.data.seq, e.data.query, e.data.ids);
+        searchWorker.postMessage({ index: searchIndex });
+      } catch (err) {
+        searchWorker = null;
+      }
+    }
+  })().catch(err => {
+    // Let the next search try again
+    searchReady = null;
+    throw err;
+  });
+  return searchReady;
+}
+
+function subjectOf(id) {
+  // Binary search for the subject that owns item number id
+  let lo = 0, hi = itemStarts.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (itemStarts[mid] <= id) lo = mid; else hi = mid - 1;
+  }
+  return lo;
+}
+
+function itemRef(id) {
+  const ref = subjectOf(id);
+  const [fi, si] = subjectRefs[ref];
+  const sub = data[fi].subjects[si];
+  const offset = id - itemStarts[ref];
+  if (offset < sub.videoCount) {
+    return { fi, si, kind: 'video', index: offset };
+  }
+  return { fi, si, kind: 'pdf', index: offset - sub.videoCount };
+}
+
+function onSearchInput(val) {
+  // Debounce so fast typing runs one query
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => runSearch(val), SEARCH_DELAY);
+}
+
+async function runSearch(val) {
+  const seq = ++searchSeq;
+  await loadSearchIndex();
+  if (searchWorker) {
+    searchWorker.postMessage({ seq, query: val });
+  } else {
+    showResults(seq, val, searchCore(searchIndex, val));
+  }
+}
+
+async function showResults(seq, val, ids) {
+  // Drop answers to queries the user has already typed past
+  if (seq !== searchSeq) return;
+  const query = val.trim().toLowerCase();
+  const results = document.getElementById('searchResults');
+  
+  // Subjects stay visible when their name, their folder's name or any of their items match
+  const hits = new Set();
+  (ids || []).forEach(id => hits.add(subjectOf(id)));
+  visibleSubjects = query ? new Set() : null;
+  const visibleFolders = new Set();
+  subjectRefs.forEach(([fi, si], ref) => {
+    if (!query || hits.has(ref) || data[fi].subjects[si].name.toLowerCase().includes(query)
+        || data[fi].folder.toLowerCase().includes(query)) {
+      if (visibleSubjects) visibleSubjects.add(fi + ':' + si);
+      visibleFolders.add(String(fi));
+    }
+  });
+  // Unexpanded folders apply the filter when their subjects are first rendered
+  document.querySelectorAll(".folder-title").forEach(f => {
+    f.style.display = visibleFolders.has(f.dataset.folder) ? "" : "none";
+    if (f.style.display) f.nextElementSibling.style.display = "none";
+  });
+  document.querySelectorAll(".subject").forEach(s => {
+    s.style.display = !visibleSubjects || visibleSubjects.has(s.dataset.folder + ':' + s.dataset.subject) ? "block" : "none";
+  });
+  
+  if (!query || !ids) {
+    results.innerHTML = '';
+    return;
+  }
+  
+  // Only the subjects behind the listed results need their data parsed
+  const shown = ids.slice(0, SEARCH_LIMIT);
+  const refs = shown.map(itemRef);
+  const contents = await Promise.all(refs.map(m => subjectData(data[m.fi].subjects[m.si])));
+  if (seq !== searchSeq) return;
+  
+  let html = '';
+  refs.forEach((m, i) => {
+    const sub = contents[i];
+    const title = m.kind === 'video' ? sub.videos[m.index].title : sub.pdfs[m.index].name;
+    html += `<div class="search-result" data-id="${shown[i]}">${m.kind === 'video' ? '🎬' : '📄'} ${title}<small>${data[m.fi].subjects[m.si].name}</small></div>`;
+  });
+  if (ids.length > SEARCH_LIMIT) {
+    html += `<div style="padding:8px 12px;color:var(--muted)">+${ids.length - SEARCH_LIMIT} more, keep typing to narrow down</div>`;
+  }
+  results.innerHTML = html || '<div style="padding:8px 12px;color:var(--muted)">No matches</div>';
+}
+
+async function openResult(m) {
+  // Expand the subject's folder, load it and jump to the item
+  const content = folderContent(m.fi);
+  content.style.display = 'block';
+  const el = content.querySelector(`.subject[data-subject="${m.si}"]`);
+  await loadSubject(data[m.fi].subjects[m.si], el);
+  if (m.kind === 'video') {
+    playlistView.scrollTo(m.index);
+    playVideo(m.index);
+  } else {
+    const pdf = currentSubject.pdfs[m.index];
+    openPdf(pdf.full_url || pdf.src);
+  }
+}
+
+document.getElementById('searchResults').addEventListener('click', e => {
+  const item = e.target.closest('.search-result');
+  if (item) {
+    openResult(itemRef(Number(item.dataset.id)));
+  }
+});
+
+/* ================= KEYBOARD SHORTCUTS ================= */
+document.addEventListener('keydown', function(e) {
+  // Space to play/pause
+  if (e.code === 'Space' && document.activeElement.tagName !== 'INPUT') {
+    e.preventDefault();
+    const apiPlayer = document.getElementById('apiPlayer');
+    if (apiPlayer.src) {
+      apiPlayer.focus();
+    }
+  }
+  
+  // F for fullscreen
+  if (e.code === 'KeyF' && document.activeElement.tagName !== 'INPUT') {
+    e.preventDefault();
+    const apiPlayer = document.getElementById('apiPlayer');
+    if (apiPlayer.src) {
+      if (apiPlayer.requestFullscreen) {
+        apiPlayer.requestFullscreen();
+      }
+    }
+  }
+});
+
+/* ================= INITIALIZATION ================= */
+renderSubjects();
+prepareSearch();
+
+// Auto-load first subject if available
+if (data.length > 0 && data[0].subjects.length > 0) {
+  setTimeout(() => {
+    const firstSubject = data[0].subjects[0];
+    const firstSubjectElement = folderContent(0).querySelector('.subject');
+    if (firstSubjectElement) {
+      loadSubject(firstSubject, firstSubjectElement);
+    }
+  }, 500);
+}
+</script>
+
+</body>
+</html>'''
+
+# Static page shell, split around the data block and manifest slots and encoded once at import
+HTML_HEAD, HTML_MID, HTML_TAIL = (
+    part.encode('utf-8') for part in re.split(r'/\*(?:BLOCKS|DATA)\*/', HTML_SHELL)
+)
+
+# Search tokens are runs of anything but whitespace and ASCII punctuation,
+# which keeps Devanagari words whole (the viewer's searchCore uses the same rule)
+TOKEN_RE = re.compile(r'[^\s!-/:-@\[-`{-~]+')
+
+def json_for_script(obj):
+    """Encode obj as JSON that is safe to embed inside a <script> block"""
+    text = json.dumps(obj, ensure_ascii=False)
+    return text.replace('</', '<\\/').replace('<!--', '\\u003c!--').encode('utf-8')
+
+def _parent_dir(prefix):
+    """Prefix up to the '/' before the last one, or '' when there is none"""
+    return prefix[:prefix.rfind('/', 0, len(prefix) - 1) + 1]
+
+class UrlPrefixes:
+    """Table of URL prefixes shared by more than one catalog URL
+    
+    Each URL is split after the longest '/' whose prefix at least one other URL
+    shares; the viewer rebuilds it as table[ref] + suffix. The table grows in
+    the order URLs are split.
+    """
+    
+    def __init__(self, data):
+        dirs = {}
+        for folder in data:
+            for subject in folder['subjects']:
+                for entry in itertools.chain(subject['videos'], subject['pdfs']):
+                    url = entry['src']
+                    directory = url[:url.rfind('/') + 1]
+                    dirs[directory] = dirs.get(directory, 0) + 1
+        
+        # URLs under each directory, its subdirectories included; deepest first,
+        # so each directory passes its total to its parent exactly once
+        self.counts = counts = dict(dirs)
+        by_length = {}
+        for directory in dirs:
+            by_length.setdefault(len(directory), []).append(directory)
+        for length in range(max(by_length, default=0), 0, -1):
+            for directory in by_length.get(length, ()):
+                parent = _parent_dir(directory)
+                if parent not in counts:
+                    counts[parent] = 0
+                    by_length.setdefault(len(parent), []).append(parent)
+                counts[parent] += counts[directory]
+        self.table = []
+        self._refs = {}
+        self._chosen = {}
+    
+    def split(self, url):
+        """Return (ref, suffix) for url"""
+        directory = url[:url.rfind('/') + 1]
+        try:
+            ref, cut = self._chosen[directory]
+        except KeyError:
+            ref, cut = self._chosen[directory] = self._choose(directory)
+        return ref, url[cut:]
+    
+    def _choose(self, directory):
+        prefix = directory
+        while prefix and self.counts[prefix] < 2:
+            prefix = _parent_dir(prefix)
+        ref = self._refs.get(prefix)
+        if ref is None:
+            ref = self._refs[prefix] = len(self.table)
+            self.table.append(prefix)
+        return ref, len(prefix)
+
+# Leading base-32 digits of pack_ints, then the digit that ends each number;
+# both ranges avoid '"', '\\' and '/', so packed strings embed as-is
+_MORE_DIGITS = [chr(59 + d) for d in range(32)]
+_LAST_DIGITS = [chr(93 + d) for d in range(32)]
+_PACKED_SMALL = [_MORE_DIGITS[n // 32] + _LAST_DIGITS[n % 32] if n >= 32 else _LAST_DIGITS[n] for n in range(1024)]
+
+def _pack_int(value):
+    digits = [_LAST_DIGITS[value % 32]]
+    value //= 32
+    while value:
+        digits.append(_MORE_DIGITS[value % 32])
+        value //= 32
+    return ''.join(reversed(digits))
+
+def pack_ints(values):
+    """Pack non-negative integers into a string, one character for each below 32"""
+    small = _PACKED_SMALL
+    return ''.join([small[value] if value < 1024 else _pack_int(value) for value in values])
+
+def encode_subject(subject, prefixes):
+    """Columnar block for one subject's videos and PDFs
+    
+    Titles and URL suffixes go in parallel arrays, URLs reference the shared
+    prefix table through a pack_ints column, and a string already seen in the
+    block is replaced by its number in order of first appearance (columns are
+    read v, vs, p, ps).
+    PDF full_url is only stored where it differs from src.
+    """
+    seen = {}
+    
+    def text(value):
+        ref = seen.get(value)
+        if ref is None:
+            seen[value] = len(seen)
+            return value
+        return ref
+    
+    def urls(entries):
+        refs, suffixes = [], []
+        for entry in entries:
+            ref, suffix = prefixes.split(entry['src'])
+            refs.append(ref)
+            suffixes.append(suffix)
+        return refs, suffixes
+    
+    videos, pdfs = subject['videos'], subject['pdfs']
+    video_refs, video_suffixes = urls(videos)
+    pdf_refs, pdf_suffixes = urls(pdfs)
+    block = {
+        'v': [text(video['title']) for video in videos],
+        'vp': pack_ints(video_refs),
+        'vs': [text(suffix) for suffix in video_suffixes],
+        'vd': ''.join('1' if video['drm'] else '0' for video in videos),
+        'p': [text(pdf['name']) for pdf in pdfs],
+        'pp': pack_ints(pdf_refs),
+        'ps': [text(suffix) for suffix in pdf_suffixes],
+    }
+    full_urls = {i: pdf['full_url'] for i, pdf in enumerate(pdfs) if pdf['full_url'] != pdf['src']}
+    if full_urls:
+        block['pf'] = full_urls
+    return block
+
+def iter_subject_blocks(data, prefixes):
+    """Yield each subject's videos and PDFs as a compact JSON byte block, in catalog order"""
+    for folder in data:
+        for subject in folder['subjects']:
+            yield json_for_script(encode_subject(subject, prefixes))
+
+def build_manifest(data):
+    """Subject names and item counts, with the number of the block holding each subject"""
+    manifest = []
+    block = 0
+    for folder in data:
+        subjects = []
+        for subject in folder['subjects']:
+            subjects.append({
+                'name': subject['name'],
+                'block': block,
+                'videoCount': len(subject['videos']),
+                'pdfCount': len(subject['pdfs'])
+            })
+            block += 1
+        manifest.append({'folder': folder['folder'], 'subjects': subjects})
+    return manifest
+
+def build_search_index(data):
+    """Token postings over video and PDF titles for the viewer's search box
+    
+    Items are numbered in catalog order (each subject's videos, then its PDFs)
+    and every posting list is delta-encoded and packed with pack_ints.
+    """
+    postings = {}
+    item = 0
+    for folder in data:
+        for subject in folder['subjects']:
+            titles = [v['title'] for v in subject['videos']] + [p['name'] for p in subject['pdfs']]
+            for title in titles:
+                for token in set(TOKEN_RE.findall(title.lower())):
+                    postings.setdefault(token, []).append(item)
+                item += 1
+    
+    # Sort in UTF-16 order so the viewer's binary search agrees with JavaScript string comparison
+    tokens = sorted(postings, key=lambda token: token.encode('utf-16-be'))
+    encoded = []
+    for token in tokens:
+        ids = postings[token]
+        encoded.append(pack_ints([ids[0]] + [b - a for a, b in zip(ids, ids[1:])]))
+    return {'count': item, 'tokens': tokens, 'postings': encoded}
+
+def iter_packed_chunks(chunks, level=9):
+    """gzip and base64-encode a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = b''
+    for chunk in chunks:
+        pending += compressor.compress(chunk)
+        # base64 works on 3-byte groups; carry the remainder to the next chunk
+        cut = len(pending) - len(pending) % 3
+        if cut:
+            yield base64.b64encode(pending[:cut])
+            pending = pending[cut:]
+    yield base64.b64encode(pending + compressor.flush())
+
+def write_block(f, block_id, payload, compress):
+    """Write one lazily parsed data block, gzip-packed when compress is set
+    
+    Returns the number of payload bytes written.
+    """
+    if compress:
+        payload = b''.join(iter_packed_chunks([payload]))
+        f.write(f'<script type="application/x-gzip-base64" id="{block_id}">'.encode('ascii'))
+    else:
+        f.write(f'<script type="application/json" id="{block_id}">'.encode('ascii'))
+    f.write(payload)
+    f.write(b'</script>\n')
+    return len(payload)
+
+def write_html(data, f, compress=None, limit=None):
+    """Stream the HTML viewer for data into a binary file; returns payload sizes
+    
+    compress=None packs the data blocks only when they exceed COMPRESS_THRESHOLD
+    bytes. Once more than limit bytes of blocks are written, stops partway and
+    returns None instead.
+    """
+    prefixes = UrlPrefixes(data)
+    blocks = iter_subject_blocks(data, prefixes)
+    buffered = []
+    if compress is None:
+        # Hold back blocks up to the threshold to decide whether packing pays off
+        size = 0
+        for block in blocks:
+            buffered.append(block)
+            size += len(block)
+            if size > COMPRESS_THRESHOLD:
+                break
+        compress = size > COMPRESS_THRESHOLD
+    
+    raw = written = 0
+    f.write(HTML_HEAD)
+    for number, block in enumerate(itertools.chain(buffered, blocks)):
+        raw += len(block)
+        written += write_block(f, f'subject-{number}', block, compress)
+        if limit is not None and written > limit:
+            return None
+    # Complete only once every subject has been encoded
+    table = json_for_script(prefixes.table)
+    raw += len(table)
+    written += write_block(f, 'url-prefixes', table, compress)
+    index = json_for_script(build_search_index(data))
+    raw += len(index)
+    written += write_block(f, 'search-index', index, compress)
+    if limit is not None and written > limit:
+        return None
+    f.write(HTML_MID)
+    f.write(json_for_script(build_manifest(data)))
+    f.write(HTML_TAIL)
+    return {'payload_bytes': raw, 'packed_bytes': written if compress else None}
+
+def fragment_script(block_id, payload):
+    """Wrap a JSON block as a data/<block_id>.js file for a split bundle"""
+    # U+2028/2029 are valid in JSON strings but end the line in older JavaScript engines
+    payload = payload.replace('\u2028'.encode('utf-8'), b'\\u2028').replace('\u2029'.encode('utf-8'), b'\\u2029')
+    return b''.join((f'catalogBlock("{block_id}", '.encode('ascii'), payload, b');\n'))
+
+def write_bundle(data, f):
+    """Write the viewer as a zip of index.html plus one data file per subject
+    
+    The index carries only the manifest, so opening it costs about the same
+    however large the catalog is; subjects and the search index load on demand.
+    Returns payload sizes like write_html.
+    """
+    raw = 0
+    prefixes = UrlPrefixes(data)
+    with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for number, block in enumerate(iter_subject_blocks(data, prefixes)):
+            raw += len(block)
+            bundle.writestr(f'data/subject-{number}.js', fragment_script(f'subject-{number}', block))
+        table = json_for_script(prefixes.table)
+        raw += len(table)
+        bundle.writestr('data/url-prefixes.js', fragment_script('url-prefixes', table))
+        index = json_for_script(build_search_index(data))
+        raw += len(index)
+        bundle.writestr('data/search-index.js', fragment_script('search-index', index))
+        bundle.writestr('index.html', b''.join((
+            HTML_HEAD, HTML_MID, json_for_script(build_manifest(data)), HTML_TAIL
+        )))
+        files = len(bundle.infolist())
+    return {'payload_bytes': raw, 'packed_bytes': None, 'bundle_files': files}
+
+def bundle_path(path):
+    """Where a viewer meant for path is written when it comes out as a split bundle"""
+    return os.path.splitext(path)[0] + '.zip'
+
+def render_catalog(data, target, compress=None, bundle=None):
+    """Render the viewer for parsed data to a file path or binary stream such as a BytesIO
+    
+    compress=None packs the data blocks only above COMPRESS_THRESHOLD bytes, and
+    bundle=None writes a split zip (see write_bundle) instead of a single HTML
+    file only when the blocks come out larger than BUNDLE_THRESHOLD bytes as
+    written. Returns payload sizes and output_bytes, with bundle_files set for
+    a bundle. For a path, 'output' names the file written: the path itself, or
+    bundle_path(path) for a bundle.
+    """
+    if not hasattr(target, 'write'):
+        target = os.fspath(target)
+        with open(target, 'wb') as f:
+            stats = render_catalog(data, f, compress, bundle)
+        # Keep a zip from ending up under an .html name
+        stats['output'] = bundle_path(target) if stats.get('bundle_files') else target
+        if stats['output'] != target:
+            os.replace(target, stats['output'])
+        return stats
+    
+    # Pipes and sockets can't be rewound, so they get the output in one piece at the end
+    out = target if hasattr(target, 'seekable') and target.seekable() else io.BytesIO()
+    start = out.tell()
+    if bundle is None:
+        # Only the size as written tells whether a single file is too large;
+        # one that passes the threshold is started over as a bundle
+        stats = write_html(data, out, compress, limit=BUNDLE_THRESHOLD)
+        if stats is None:
+            out.seek(start)
+            out.truncate()
+            stats = write_bundle(data, out)
+    elif bundle:
+        stats = write_bundle(data, out)
+    else:
+        stats = write_html(data, out, compress)
+    stats['output_bytes'] = out.tell() - start
+    if out is not target:
+        target.write(out.getbuffer())
+    return stats
+
+def catalog_stats(data):
+    """Count categories, subjects, videos and PDFs in parsed data"""
+    subjects = [subject for folder in data for subject in folder['subjects']]
+    return {
+        'categories': len(data),
+        'subjects': len(subjects),
+        'videos': sum(len(subject['videos']) for subject in subjects),
+        'pdfs': sum(len(subject['pdfs']) for subject in subjects)
+    }
+
+def _hold_last(lines, held):
+    """Yield every line but the last, which is appended to held"""
+    previous = None
+    for line in lines:
+        if previous is not None:
+            yield previous
+        previous = line
+    if previous is not None:
+        held.append(previous)
+
+# Accepted upload names and how each is decompressed
+UPLOAD_FORMATS = (
+    ('.txt', None),
+    ('.txt.gz', 'gzip'),
+    ('.gz', 'gzip'),
+    ('.txt.bz2', 'bz2'),
+    ('.bz2', 'bz2'),
+    ('.zip', 'zip'),
+)
+
+def upload_format(file_name):
+    """Return (catalog name, compression) for an accepted upload name, or None"""
+    lower = file_name.lower()
+    for suffix, compression in UPLOAD_FORMATS:
+        if lower.endswith(suffix):
+            return file_name[:-len(suffix)], compression
+    return None
+
+def _is_catalog_member(info):
+    name = info.filename.replace('\\', '/')
+    base = name.rsplit('/', 1)[-1]
+    # Skip folders and the resource forks macOS adds to archives
+    return (not info.is_dir() and base.lower().endswith('.txt')
+            and not base.startswith('._') and not name.startswith('__MACOSX/'))
+
+class _CappedReader(io.BufferedIOBase):
+    """Binary stream over a decompressor that fails once a shared byte budget runs out"""
+    
+    def __init__(self, raw, budget):
+        self._raw = raw
+        self._budget = budget
+    
+    def readable(self):
+        return True
+    
+    def read(self, size=-1):
+        return self._count(self._raw.read(self._limit(size)))
+    
+    def read1(self, size=-1):
+        return self._count(self._raw.read1(self._limit(size)))
+    
+    def _limit(self, size):
+        # One byte past the budget is enough to tell it was exceeded
+        left = self._budget['left'] + 1
+        return left if size is None or size < 0 or size > left else size
+    
+    def _count(self, data):
+        self._budget['left'] -= len(data)
+        if self._budget['left'] < 0:
+            raise ValueError(f"Catalog is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB once decompressed")
+        return data
+
+def iter_archive_texts(binary, compression, stats):
+    """Yield a decoded text stream for each catalog inside a compressed upload
+    
+    Members are decompressed as they are read, one at a time, so neither the
+    archive nor its contents are ever inflated in full. Reading fails with
+    ValueError once all members together pass MAX_UPLOAD_BYTES.
+    """
+    budget = {'left': MAX_UPLOAD_BYTES}
+    if compression == 'zip':
+        with zipfile.ZipFile(binary) as archive:
+            members = [info for info in archive.infolist() if _is_catalog_member(info)]
+            if not members:
+                raise ValueError("No .txt files found in the archive")
+            stats['members'] = len(members)
+            for info in members:
+                with archive.open(info) as member, io.TextIOWrapper(_CappedReader(member, budget), encoding='utf-8') as f:
+                    yield f
+        return
+    
+    stats['members'] = 1
+    stream = gzip.GzipFile(fileobj=binary, mode='rb') if compression == 'gzip' else bz2.BZ2File(binary)
+    with stream, io.TextIOWrapper(_CappedReader(stream, budget), encoding='utf-8') as f:
+        yield f
+
+def update_catalog(source, previous=None, start=0, tail='', output_path=None, compression=None, snapshot_path=None):
+    """Parse an upload, merge it into an earlier version and render the viewer
+    
+    source is the upload as bytes or a file path, read from byte offset start,
+    or decompressed as a stream when compression ('gzip', 'bz2' or 'zip') is set.
+    previous is the snapshot of the earlier version, as bytes or a file path
+    (None parses from scratch), and tail that version's unfinished last line,
+    parsed again in front of the new lines. Subjects for every complete line are
+    pickled for the next update, to snapshot_path or, when it is None, into the
+    returned snapshot bytes. Renders to output_path, or returns the HTML bytes
+    when it is None (runs inside a pool worker). Returns (html, snapshot, stats).
+    """
+    stats = {'lines': 0, 'incremental': previous is not None}
+    held = []
+    deduplicator = Deduplicator(DEDUP_POLICY)
+    
+    def counted(lines):
+        for line in lines:
+            stats['lines'] += 1
+            yield line
+    
+    parse_start = time.perf_counter()
+    tree = {}
+    if isinstance(previous, bytes):
+        tree = pickle.loads(previous)
+    elif previous:
+        with open(previous, 'rb') as f:
+            tree = pickle.load(f)
+    deduplicator.add_existing(tree)
+    
+    binary = open(source, 'rb') if isinstance(source, str) else io.BytesIO(source)
+    with binary:
+        size = binary.seek(0, io.SEEK_END)
+        binary.seek(start)
+        if compression:
+            # Byte offsets don't carry over to archives; every member's last line counts as complete
+            texts = iter_archive_texts(binary, compression, stats)
+            complete = True
+        else:
+            complete = True
+            if size > start:
+                binary.seek(size - 1)
+                complete = binary.read(1) in (b'\n', b'\r')
+                binary.seek(start)
+            texts = [io.TextIOWrapper(binary, encoding='utf-8')]
+        
+        # Lines of all members in order, merged into one catalog
+        lines = counted(itertools.chain.from_iterable(iter_lines(f) for f in texts))
+        if tail:
+            lines = itertools.chain([tail], lines)
+        if not complete:
+            # An unfinished last line may still grow, so keep it out of the snapshot
+            lines = _hold_last(lines, held)
+        merge_entries(tree, deduplicator.filter(iter_entries(lines)))
+    
+    snapshot = None
+    if snapshot_path:
+        with open(snapshot_path, 'wb') as f:
+            pickle.dump(tree, f, pickle.HIGHEST_PROTOCOL)
+    else:
+        snapshot = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+    merge_entries(tree, deduplicator.filter(iter_entries(held)))
+    stats['duplicates'] = deduplicator.removed
+    parsed_data = build_groups(tree)
+    stats['tail'] = held[0] if held else ''
+    stats['consumed'] = None if compression else size - start - len(stats['tail'].encode('utf-8'))
+    stats['parse_seconds'] = time.perf_counter() - parse_start
+    
+    render_start = time.perf_counter()
+    sink = open(output_path, 'wb') if output_path else io.BytesIO()
+    with sink:
+        stats.update(render_catalog(parsed_data, sink))
+        html = None if output_path else sink.getvalue()
+    stats['render_seconds'] = time.perf_counter() - render_start
+    
+    stats.update(catalog_stats(parsed_data))
+    return html, snapshot, stats
+
+def hash_file(path, chunk_size=READ_CHUNK_SIZE):
+    """SHA-256 of a file on disk, read in bounded chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extend_digest(digest, source, start, length, prefix=b''):
+    """Chain prefix plus length bytes of source (bytes or a file path) from start onto digest"""
+    h = hashlib.sha256(digest + prefix)
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(length, READ_CHUNK_SIZE))
+                if not chunk:
+                    break
+                h.update(chunk)
+                length -= len(chunk)
+    else:
+        h.update(source[start:start + length])
+    return h.digest()
+
+def shared_prefix(source, size, version):
+    """Bytes of source already covered by a stored version, or 0 when it does not start with it"""
+    total = sum(version['segments'])
+    if not total or size < total:
+        return 0
+    digest = b''
+    position = 0
+    for length in version['segments']:
+        digest = extend_digest(digest, source, position, length)
+        position += length
+    return total if digest == version['digest'] else 0
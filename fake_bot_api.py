@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import statistics
+import subprocess
+import urllib.parse
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FAKE_TOKEN = '123456:fake-token'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot',
+            'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+
+class FakeBotAPI:
+    """Just enough of the Bot API to receive /start and record the bot's replies
+
+    Updates are handed out through getUpdates, or POSTed to the webhook once the
+    bot has called setWebhook. Each sendMessage is timestamped per chat.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8081):
+        self.updates = []
+        self.webhook = None
+        self.polled = threading.Event()
+        self.sent = {}
+        self.injected = {}
+        self.rejected = 0
+        self._cond = threading.Condition()
+        self._message_id = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://{host}:{self.server.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='fake-bot-api', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                params = api.parse_params(self.headers.get('Content-Type', ''), body)
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                result = api.call(method, params)
+                payload = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def parse_params(content_type, body):
+        if 'json' in content_type:
+            return json.loads(body or b'{}')
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(body.decode('utf-8')).items()}
+        for key, value in params.items():
+            if value[:1] in ('{', '['):
+                params[key] = json.loads(value)
+        return params
+
+    def call(self, method, params):
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'setWebhook':
+            self.webhook = (params['url'], params.get('secret_token'))
+            self.polled.set()
+            return True
+        if method == 'deleteWebhook':
+            self.webhook = None
+            return True
+        if method == 'getUpdates':
+            return self.get_updates(int(params.get('offset') or 0), float(params.get('timeout') or 0))
+        if method == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            with self._cond:
+                self._message_id += 1
+                self.sent.setdefault(chat_id, time.perf_counter())
+                self._cond.notify_all()
+                return {'message_id': self._message_id, 'date': int(time.time()),
+                        'chat': {'id': chat_id, 'type': 'private'}, 'text': params.get('text', '')}
+        return True
+
+    def get_updates(self, offset, timeout):
+        self.polled.set()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.updates = [u for u in self.updates if u['update_id'] >= offset]
+            while not self.updates and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            return list(self.updates)
+
+    def inject_start(self, update_id, secret=None):
+        """Deliver one /start from a fresh chat; returns the chat id"""
+        chat_id = 1000 + update_id
+        update = {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Bench'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+                'text': '/start',
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+            },
+        }
+        self.injected[chat_id] = time.perf_counter()
+        if self.webhook:
+            url, expected = self.webhook
+            request = urllib.request.Request(url, json.dumps(update).encode('utf-8'), method='POST', headers={
+                'Content-Type': 'application/json',
+                'X-Telegram-Bot-Api-Secret-Token': expected if secret is None else secret,
+            })
+            try:
+                urllib.request.urlopen(request, timeout=10).read()
+            except urllib.error.HTTPError:
+                self.rejected += 1
+        else:
+            with self._cond:
+                self.updates.append(update)
+                self._cond.notify_all()
+        return chat_id
+
+    def wait_replies(self, chat_ids, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not all(c in self.sent for c in chat_ids) and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+        return [self.sent[c] - self.injected[c] for c in chat_ids if c in self.sent]
+
+def wait_listening(port, timeout):
+    """Block until the bot's webhook listener accepts connections"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def run_bot(api, mode, webhook_port):
+    """Start telegram_bot.py as a subprocess pointed at the fake API"""
+    env = dict(os.environ, BOT_TOKEN=FAKE_TOKEN, BOT_API_URL=api.url, METRICS_PORT='0')
+    env.pop('WEBHOOK_URL', None)
+    if mode == 'webhook':
+        env.update(WEBHOOK_URL=f'http://127.0.0.1:{webhook_port}', WEBHOOK_LISTEN='127.0.0.1',
+                   WEBHOOK_PORT=str(webhook_port), WEBHOOK_SECRET='fake-secret')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telegram_bot.py')
+    return subprocess.Popen([sys.executable, script], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def measure(mode, updates, interval, webhook_port):
+    """End-to-end /start latency in seconds for one transport"""
+    api = FakeBotAPI(port=0).start()
+    bot = run_bot(api, mode, webhook_port)
+    try:
+        if not api.polled.wait(30):
+            raise RuntimeError(f"bot did not connect in {mode} mode")
+        if mode == 'webhook' and not api.webhook:
+            raise RuntimeError("bot fell back to polling instead of setting the webhook")
+        if mode == 'webhook':
+            wait_listening(webhook_port, 30)
+            # A wrong secret must be refused before any handler runs
+            api.inject_start(0, secret='wrong-secret')
+        chat_ids = []
+        for update_id in range(1, updates + 1):
+            chat_ids.append(api.inject_start(update_id))
+            time.sleep(interval)
+        latencies = api.wait_replies(chat_ids, 30)
+        return latencies, api.rejected
+    finally:
+        bot.terminate()
+        bot.wait(10)
+        api.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare polling and webhook update latency against a local fake Bot API")
+    parser.add_argument('--mode', choices=('polling', 'webhook', 'both'), default='both')
+    parser.add_argument('--updates', type=int, default=50, help="/start updates per transport")
+    parser.add_argument('--interval', type=float, default=0.05, help="seconds between updates")
+    parser.add_argument('--webhook-port', type=int, default=8443)
+    args = parser.parse_args(argv)
+
+    modes = ('polling', 'webhook') if args.mode == 'both' else (args.mode,)
+    for mode in modes:
+        latencies, rejected = measure(mode, args.updates, args.interval, args.webhook_port)
+        if not latencies:
+            print(f"❌ {mode}: no replies")
+            continue
+        ms = sorted(l * 1000 for l in latencies)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        print(f"📊 {mode:8} {len(ms)}/{args.updates} replies  "
+              f"p50 {statistics.median(ms):.1f} ms  p95 {p95:.1f} ms  max {ms[-1]:.1f} ms"
+              + (f"  ({rejected} bad-secret request rejected)" if mode == 'webhook' else ''))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
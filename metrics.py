@@ -0,0 +1,199 @@
+"""Minimal Prometheus-style metrics served over a background HTTP endpoint"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Latency buckets in seconds, from fast cache hits to multi-minute catalogs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+class _Metric:
+    """Shared label handling; subclasses keep one value holder per label set"""
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), registry=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Export unlabelled metrics as 0 before their first update
+            self.labels()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values, **kwargs):
+        """Child metric for one set of label values"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child
+        return self.labels()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def render(self, name, names, values):
+        return [f'{name}{_format_labels(names, values)} {self.value:g}']
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), registry=None, func=None):
+        self.func = func
+        super().__init__(name, help_text, labelnames, registry)
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set(self, value):
+        self._default().set(value)
+
+    def render(self):
+        if self.func is not None:
+            self._default().set(self.func())
+        return super().render()
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, names, values):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'{name}_bucket{_format_labels(names, values, [("le", le)])} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(names, values)} {total:g}')
+        lines.append(f'{name}_count{_format_labels(names, values)} {cumulative}')
+        return lines
+
+class Histogram(_Metric):
+    """Distribution of observed values over cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+class Registry:
+    """Collection of metrics rendered together in the text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics from a daemon thread; returns the server"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes are frequent; keep them out of the bot log
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -1,8 +1,19 @@
+import io
 import os
-import re
-import json
-import urllib.parse
+import sys
+import time
+import asyncio
+import hashlib
+import secrets
 import logging
+import multiprocessing
+import tempfile
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import metrics
+from catalog_engine import update_catalog, upload_format, hash_file, extend_digest, shared_prefix
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
@@ -16,731 +27,767 @@ logger = logging.getLogger(__name__)
 # Get bot token from environment variable
 BOT_TOKEN = os.environ.get('BOT_TOKEN', '7601635113:AAHjmE2yjru1sIIbAW6g56-sIc30cv4Tsm8')
 
-def parse_txt_file(file_path):
-    """Parse the txt file and classify subjects with videos and PDFs"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+# Alternative Bot API server, e.g. a local fake for latency tests
+BOT_API_URL = os.environ.get('BOT_API_URL', '').rstrip('/')
+
+# Webhook transport, used instead of polling when WEBHOOK_URL (the public base URL) is set
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.environ.get('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('WEBHOOK_PORT', os.environ.get('PORT', '8443')))
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', 'telegram')
+# Telegram echoes this in X-Telegram-Bot-Api-Secret-Token; requests without it are rejected
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+
+# Catalog versions remembered per chat and file name for incremental updates
+CATALOG_MAX_ENTRIES = int(os.environ.get('CATALOG_MAX_ENTRIES', '64'))
+# Bytes of catalog snapshots kept in memory; older ones are moved to temp files
+CATALOG_MEMORY_BUDGET = int(os.environ.get('CATALOG_MEMORY_BUDGET', str(64 * 1024 * 1024)))
+
+# Uploads larger than this many bytes are spooled to temp files instead of memory
+SPILL_THRESHOLD = int(os.environ.get('SPILL_THRESHOLD', str(8 * 1024 * 1024)))
+
+# Generated viewers are remembered for resending (entries, seconds)
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+CACHE_TTL = int(os.environ.get('CACHE_TTL', '86400'))
+
+# Local HTTP endpoint for Prometheus-style metrics (port 0 disables it);
+# the default stays clear of node_exporter's 9100
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9387'))
+
+# Worker pool for parsing and HTML rendering ('process' or 'thread')
+WORKER_MODE = os.environ.get('WORKER_MODE', 'process')
+WORKER_COUNT = int(os.environ.get('WORKER_COUNT', os.cpu_count() or 1))
+# Jobs each worker runs before it is replaced with a fresh one
+WORKER_MAX_TASKS = int(os.environ.get('WORKER_MAX_TASKS', '50'))
+# Jobs allowed to wait for a free worker before new uploads block
+WORKER_QUEUE_SIZE = int(os.environ.get('WORKER_QUEUE_SIZE', '16'))
+
+# Admission control: jobs running at once, overall and per user, and how many may wait.
+# Twice the worker count keeps every worker busy while other jobs download or upload.
+MAX_ACTIVE_JOBS = int(os.environ.get('MAX_ACTIVE_JOBS', max(4, 2 * WORKER_COUNT)))
+MAX_JOBS_PER_USER = int(os.environ.get('MAX_JOBS_PER_USER', '1'))
+MAX_QUEUED_PER_USER = int(os.environ.get('MAX_QUEUED_PER_USER', '10'))
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', '200'))
+# Minimum seconds between queue position edits of one message, to stay under Telegram's rate limits
+QUEUE_EDIT_INTERVAL = float(os.environ.get('QUEUE_EDIT_INTERVAL', '10'))
+
+def make_temp_path(suffix):
+    """Create a uniquely named temp file for uploads that spill to disk"""
+    fd, path = tempfile.mkstemp(prefix='ebabu-', suffix=suffix)
+    os.close(fd)
+    return path
+
+def format_size(size):
+    """Human readable byte count"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def build_caption(stats):
+    """Reply caption for a generated viewer"""
+    compression = ''
+    if stats.get('packed_bytes'):
+        compression = (
+            f"• 🗜️ Compressed: {format_size(stats['payload_bytes'])} → "
+            f"{format_size(stats['packed_bytes'])} "
+            f"({stats['payload_bytes'] / stats['packed_bytes']:.1f}x)\n"
+        )
+    update = ''
+    if stats.get('bundle_files'):
+        update += (f"• 🗂️ Split into {stats['bundle_files']} files: "
+                   f"extract the zip and open index.html\n")
+    if stats.get('members', 0) > 1:
+        update += f"• 📦 Merged {stats['members']} catalogs from the archive\n"
+    if stats.get('duplicates'):
+        update += f"• ♻️ Duplicates removed: {stats['duplicates']}\n"
+    if stats.get('incremental'):
+        update += f"• ➕ Merged {stats['lines']} new lines into the previous version\n"
+    return (
+        f"✅ **HTML Viewer Generated!**\n\n"
+        f"📊 **Statistics:**\n"
+        f"• 📂 Categories: {stats['categories']}\n"
+        f"• 📁 Subjects: {stats['subjects']}\n"
+        f"• 🎬 Videos: {stats['videos']}\n"
+        f"• 📄 PDFs: {stats['pdfs']}\n"
+        f"{update}"
+        f"{compression}\n"
+        f"**Features:**\n"
+        f"• 🎯 API Video Player\n"
+        f"• 📄 PDFs open in new tab\n"
+        f"• 🔍 Search functionality\n"
+        f"• 🌙/☀️ Dark/Light theme\n"
+        f"• 📱 Mobile responsive"
+    )
+
+class ResultCache:
+    """LRU cache of generated viewers with a time-to-live, keyed by upload id or content hash"""
     
-    subjects_dict = {}
+    def __init__(self, max_entries=256, ttl=86400, retain=None, release=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Called with each value as it enters and leaves the cache, so whatever
+        # it refers to stays around as long as the entry does
+        self.retain = retain
+        self.release = release
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    def get(self, key, final=True):
+        """Return the cached result for key, or None
         
-        # Parse line: (Category)Title:URL
-        match = re.match(r'\(([^)]+)\)(.+?):(https?://.+)', line)
-        if not match:
-            continue
-        
-        category = match.group(1).strip()
-        title = match.group(2).strip()
-        url = match.group(3).strip()
-        
-        # Extract subject name from title
-        subject_match = re.search(r'(?:Lect[.-]?\d+\s+)(.+?)(?:\s*\(|$)', title)
-        if subject_match:
-            subject_name = subject_match.group(1).strip()
-        else:
-            subject_match = re.search(r'Lect[.-]?\d+\s+(.+)', title)
-            if subject_match:
-                subject_name = subject_match.group(1).strip()
+        Pass final=False when a miss will be followed by a lookup under another
+        key, so each upload counts as one hit or one miss.
+        """
+        item = self._entries.get(key)
+        if item is not None and self.ttl and time.monotonic() - item[0] > self.ttl:
+            self._drop(self._entries.pop(key))
+            item = None
+        if item is None:
+            if final:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+    
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        if self.retain:
+            self.retain(value)
+        old = self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic(), value)
+        if old is not None:
+            self._drop(old)
+        while len(self._entries) > self.max_entries:
+            self._drop(self._entries.popitem(last=False)[1])
+    
+    def clear(self):
+        for item in self._entries.values():
+            self._drop(item)
+        self._entries.clear()
+    
+    def _drop(self, item):
+        if self.release:
+            self.release(item[1])
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+class CatalogStore:
+    """Last parsed version of each chat's catalogs, keyed by (chat id, file name)
+    
+    A version holds the snapshot of the merged subjects (pickled bytes, or the
+    file they spilled to for large catalogs), the lengths of the byte ranges it
+    was built from with their chained digest, and the unfinished last line.
+    Least recently used versions are dropped. A snapshot file is deleted once
+    no key stores its version and no job or cached viewer has retained it.
+    Snapshots still in memory are written out to temp files, least recently
+    used first, while together they take more than memory_budget bytes.
+    """
+    
+    def __init__(self, max_entries=64, memory_budget=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.memory_budget = memory_budget
+        self.memory_bytes = 0
+        self._versions = OrderedDict()
+        # Every retained version, stored or not, by id in least recently used order
+        self._live = OrderedDict()
+    
+    def get(self, key):
+        """Stored version for key, or None"""
+        version = self._versions.get(key)
+        if version is not None:
+            self._versions.move_to_end(key)
+            self._live.move_to_end(id(version))
+        return version
+    
+    def find_base(self, chat_id, file_name):
+        """Version a delta upload applies to: same file name, else the chat's latest"""
+        if (chat_id, file_name) in self._versions:
+            return (chat_id, file_name), self.get((chat_id, file_name))
+        for key in reversed(self._versions):
+            if key[0] == chat_id:
+                return key, self.get(key)
+        return None, None
+    
+    def put(self, key, version):
+        """Store a version, releasing the one it replaces or evicts"""
+        self.retain(version)
+        old = self._versions.pop(key, None)
+        self._versions[key] = version
+        self.release(old)
+        while len(self._versions) > self.max_entries:
+            self.release(self._versions.popitem(last=False)[1])
+        self._spill()
+    
+    def retain(self, version):
+        """Keep version's snapshot until release(), even if the version is replaced meanwhile"""
+        if version is not None:
+            version['refs'] += 1
+            if version['refs'] == 1:
+                self._live[id(version)] = version
+                if isinstance(version['snapshot'], bytes):
+                    self.memory_bytes += len(version['snapshot'])
             else:
-                subject_name = "General"
-        
-        # Clean up subject name
-        subject_name = re.sub(r'\s+', ' ', subject_name)
-        
-        # Determine if it's video or PDF
-        is_pdf = url.endswith('.pdf')
-        is_video = not is_pdf
-        
-        # Process Classplus URLs through API
-        if is_video and 'classplus' in url.lower():
-            url = f"https://engineers-babu.onrender.com/?url={urllib.parse.quote(url)}"
+                self._live.move_to_end(id(version))
+        return version
+    
+    def release(self, version):
+        if version is not None:
+            version['refs'] -= 1
+            if not version['refs']:
+                del self._live[id(version)]
+                if isinstance(version['snapshot'], bytes):
+                    self.memory_bytes -= len(version['snapshot'])
+                self._remove(version)
+    
+    def clear(self):
+        for version in self._live.values():
+            self._remove(version)
+        self._live.clear()
+        self._versions.clear()
+        self.memory_bytes = 0
+    
+    def _spill(self):
+        """Move least recently used snapshots to disk until the rest fit the budget"""
+        for version in list(self._live.values()):
+            if self.memory_bytes <= self.memory_budget:
+                break
+            snapshot = version['snapshot']
+            if not isinstance(snapshot, bytes):
+                continue
+            path = make_temp_path('.catalog')
+            try:
+                with open(path, 'wb') as f:
+                    f.write(snapshot)
+            except OSError as e:
+                logger.warning(f"Could not spill a catalog snapshot: {e}")
+                if os.path.exists(path):
+                    os.remove(path)
+                break
+            # Jobs already running keep the bytes they were given; later ones read the file
+            version['snapshot'] = path
+            self.memory_bytes -= len(snapshot)
+    
+    @staticmethod
+    def _remove(version):
+        if isinstance(version['snapshot'], str) and os.path.exists(version['snapshot']):
+            os.remove(version['snapshot'])
+
+class WorkerPool:
+    """Run CPU-bound jobs off the event loop in a recycled executor"""
+    
+    def __init__(self, mode='process', workers=None, max_tasks=50, queue_size=16):
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_tasks = max_tasks
+        self.queue_size = queue_size
+        self._executor = None
+        self._tasks = 0
+        self._slots = None
+        self._retry_slots = None
+        self.waiting = 0
+        self.active = 0
+    
+    def _new_executor(self):
+        if self.mode == 'thread':
+            return ThreadPoolExecutor(max_workers=self.workers)
+        # Spawn keeps workers clear of the bot's event loop and HTTP threads. Each
+        # worker still re-imports this script as __mp_main__, telegram included,
+        # though main() only runs in the bot process
+        context = multiprocessing.get_context('spawn')
+        if self.max_tasks and sys.version_info >= (3, 11):
+            # Workers retire one at a time, so the rest keep running meanwhile
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                       max_tasks_per_child=self.max_tasks)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+    
+    def _recycles_whole_pool(self):
+        return self.mode == 'process' and self.max_tasks and sys.version_info < (3, 11)
+    
+    def _get_executor(self):
+        # Without max_tasks_per_child, retire the whole executor once every worker
+        # has had about max_tasks jobs so leaked worker memory is returned
+        if (self._executor is not None and self._recycles_whole_pool()
+                and self._tasks >= self.max_tasks * self.workers):
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._executor is None:
+            self._executor = self._new_executor()
+            self._tasks = 0
+        self._tasks += 1
+        return self._executor
+    
+    async def start(self):
+        """Start every worker up front so the first jobs don't pay for spawning"""
+        if self.mode != 'process':
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)))
+    
+    async def run(self, func, *args):
+        """Run func(*args) in the pool, waiting for a slot when the queue is full"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+            self._retry_slots = asyncio.Semaphore(self.workers)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A worker died mid-job (e.g. killed for memory) and broke the whole
+                # executor, failing every job in it; later jobs get a fresh one
+                self._discard(executor)
+            # We can't tell which job killed it, so each retries once in a process
+            # of its own, where a repeat crash fails only that job. At most
+            # `workers` of them run at once, so memory is not exhausted again
+            async with self._retry_slots:
+                isolated = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+                try:
+                    return await loop.run_in_executor(isolated, func, *args)
+                finally:
+                    isolated.shutdown(wait=False)
+        finally:
+            self.active -= 1
+            self._slots.release()
+    
+    def _discard(self, executor):
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False)
+    
+    def queue_depth(self):
+        """Jobs waiting for a slot plus jobs queued inside the executor"""
+        return self.waiting + max(0, self.active - self.workers)
+    
+    def shutdown(self):
+        """Stop the current executor, letting queued jobs finish"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+class QueueFull(Exception):
+    """Raised when a user or the whole bot already has too many jobs waiting"""
+
+class JobScheduler:
+    """Admission control in front of the pipeline
+    
+    Caps running jobs globally and per user, and hands free slots to waiting
+    users in round-robin order so one user's batch cannot starve the rest.
+    Runs entirely on the event loop, so no locking is needed.
+    """
+    
+    def __init__(self, max_active=4, per_user=1, max_queued_per_user=10, max_queued=200, edit_interval=10):
+        self.max_active = max_active
+        self.per_user = per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.max_queued = max_queued
+        self.edit_interval = edit_interval
+        self.active = 0
+        # Kept as a plain count because the metrics thread reads it while the loop edits _queues
+        self._waiting = 0
+        self._user_active = {}
+        # user -> waiting entries, ordered by whose turn is next
+        self._queues = OrderedDict()
+    
+    def waiting(self):
+        """Number of jobs waiting for a slot"""
+        return self._waiting
+    
+    def _can_start(self, user):
+        return self.active < self.max_active and self._user_active.get(user, 0) < self.per_user
+    
+    def _start(self, user):
+        self.active += 1
+        self._user_active[user] = self._user_active.get(user, 0) + 1
+    
+    def _release(self, user):
+        self.active -= 1
+        self._user_active[user] -= 1
+        if not self._user_active[user]:
+            del self._user_active[user]
+        self._dispatch()
+    
+    def _dispatch(self):
+        # Give free slots to the next user in turn that is under its own cap
+        started = True
+        while started and self.active < self.max_active:
+            started = False
+            for user, queue in self._queues.items():
+                if not self._can_start(user):
+                    continue
+                entry = queue.popleft()
+                self._waiting -= 1
+                if queue:
+                    self._queues.move_to_end(user)
+                else:
+                    del self._queues[user]
+                self._start(user)
+                entry['future'].set_result(None)
+                started = True
+                break
+        self._notify_positions()
+    
+    def _notify_positions(self):
+        # Expected start order: one job from each user in turn
+        queues = [list(queue) for queue in self._queues.values()]
+        position = 0
+        for depth in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    entry = queue[depth]
+                    if entry['callback'] and entry['position'] != position:
+                        entry['position'] = position
+                        if entry['reporter'] is None or entry['reporter'].done():
+                            entry['reporter'] = asyncio.ensure_future(self._report_positions(entry))
+    
+    async def _report_positions(self, entry):
+        # One edit at a time per message and at most one per edit_interval;
+        # positions that change in between are coalesced into the latest
+        reported = None
+        while entry['position'] != reported:
+            reported = entry['position']
+            entry['edit'] = asyncio.ensure_future(self._report(entry['callback'], reported))
+            # Shielded so stopping the reporter never cuts an edit off halfway
+            await asyncio.shield(entry['edit'])
+            await asyncio.sleep(self.edit_interval)
+    
+    @staticmethod
+    async def _report(callback, position):
+        try:
+            await callback(position)
+        except Exception as e:
+            logger.debug(f"Could not report queue position: {e}")
+    
+    @staticmethod
+    async def _stop_reports(entry):
+        """Cancel pending position edits and wait for one already sent to land"""
+        if entry['reporter'] is not None:
+            entry['reporter'].cancel()
+        if entry['edit'] is not None:
+            await entry['edit']
+    
+    async def _acquire(self, user, on_position):
+        if user not in self._queues and self._can_start(user):
+            self._start(user)
+            return
+        if len(self._queues.get(user, ())) >= self.max_queued_per_user:
+            raise QueueFull(f"You already have {self.max_queued_per_user} files waiting. Please wait for them to finish.")
+        if self.waiting() >= self.max_queued:
+            raise QueueFull("The bot is very busy right now. Please try again in a few minutes.")
         
-        # Initialize subject if not exists
-        if subject_name not in subjects_dict:
-            subjects_dict[subject_name] = {
-                'videos': [],
-                'pdfs': []
-            }
+        entry = {
+            'future': asyncio.get_running_loop().create_future(),
+            'callback': on_position,
+            'position': None,
+            'reporter': None,
+            'edit': None
+        }
+        self._queues.setdefault(user, deque()).append(entry)
+        self._waiting += 1
+        self._notify_positions()
+        try:
+            await entry['future']
+        except asyncio.CancelledError:
+            if entry['reporter'] is not None:
+                entry['reporter'].cancel()
+            if entry['future'].done() and not entry['future'].cancelled():
+                # Slot was granted just as the waiter was cancelled
+                self._release(user)
+            else:
+                self._queues[user].remove(entry)
+                self._waiting -= 1
+                if not self._queues[user]:
+                    del self._queues[user]
+                self._notify_positions()
+            raise
+        try:
+            # The job may edit the same message next, so no position may land after that
+            await self._stop_reports(entry)
+        except asyncio.CancelledError:
+            self._release(user)
+            raise
+    
+    @asynccontextmanager
+    async def slot(self, user, on_position=None):
+        """Hold a job slot for user, waiting in line if needed
         
-        # Add to appropriate list
-        if is_video:
-            subjects_dict[subject_name]['videos'].append({
-                'title': title,
-                'src': url,
-                'drm': 'classplus' in match.group(3).lower()
-            })
-        else:
-            subjects_dict[subject_name]['pdfs'].append({
-                'name': title,
-                'src': url,
-                'full_url': url  # Keep original URL for opening in new tab
-            })
-    
-    # Convert to the required format
-    result = []
-    for subject_name, content in subjects_dict.items():
-        if content['videos'] or content['pdfs']:
-            result.append({
-                'folder': subject_name,
-                'subjects': [{
-                    'name': subject_name,
-                    'videos': content['videos'],
-                    'pdfs': content['pdfs']
-                }]
-            })
-    
-    return result
-
-def generate_html(data, output_path):
-    """Generate HTML file from parsed data"""
-    # Convert data to JSON string for JavaScript - escape properly
-    data_json = json.dumps(data, ensure_ascii=False)
-    # Escape for JavaScript
-    data_json = data_json.replace('\\', '\\\\').replace('"', '\\"').replace("'", "\\'")
-    
-    html_template = f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Engineers Babu | HTML Viewer</title>
-
-<style>
-/* ================= THEME VARIABLES ================= */
-:root {{
-  /* 🌙 DARK THEME */
-  --page-bg:#0f1117;
-  --card-bg:#161b22;
-  --inner-bg:#1f2633;
-  --text:#e5e7eb;
-  --muted:#9ca3af;
-  --border:rgba(255,255,255,0.08);
-  --shadow:none;
-  --primary:#2563eb;
-}}
-
-.light {{
-  /* ☀️ LIGHT THEME */
-  --page-bg:#f4f6fb;
-  --card-bg:#ffffff;
-  --inner-bg:#f1f4fb;
-  --text:#1f2937;
-  --muted:#6b7280;
-  --border:rgba(0,0,0,0.06);
-  --shadow:0 8px 24px rgba(0,0,0,0.05);
-  --primary:#2563eb;
-}}
-
-/* ================= BASE ================= */
-* {{
-  margin:0;
-  padding:0;
-  box-sizing:border-box;
-  font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto;
-}}
-
-body {{
-  background:var(--page-bg);
-  color:var(--text);
-  transition:background .3s,color .3s;
-}}
-
-/* ================= HEADER ================= */
-.main-header {{
-  position:relative;
-  display:flex;
-  justify-content:flex-end;
-  align-items:center;
-  padding:18px 20px;
-  background:var(--card-bg);
-  border-bottom:1px solid var(--border);
-}}
-
-.title-box {{
-  position:absolute;
-  left:50%;
-  transform:translateX(-50%);
-  text-align:center;
-}}
-
-.title-box h1 {{
-  font-size:42px;
-  font-weight:800;
-  background:linear-gradient(90deg,#00f5ff,#E50914,#ffcc00);
-  -webkit-background-clip:text;
-  -webkit-text-fill-color:transparent;
-  letter-spacing:2px;
-}}
-
-.title-box span {{
-  font-size:13px;
-  color:var(--muted);
-  letter-spacing:3px;
-}}
-
-.toggle {{
-  cursor:pointer;
-  padding:8px 14px;
-  border-radius:20px;
-  background:var(--inner-bg);
-  border:1px solid var(--border);
-}}
-
-/* ===== GRADIENT LINE ===== */
-.gradient-bar {{
-  height:6px;
-  background:linear-gradient(
-    90deg,
-    #00f5ff,
-    #7a00ff,
-    #E50914,
-    #ffcc00
-  );
-}}
-
-/* ================= SEARCH ================= */
-.search {{
-  padding:14px;
-}}
-
-.search input {{
-  width:100%;
-  padding:12px;
-  border-radius:12px;
-  border:none;
-  outline:none;
-  background:var(--card-bg);
-  color:var(--text);
-  box-shadow:var(--shadow);
-}}
-
-/* ================= LAYOUT ================= */
-.container {{
-  display:grid;
-  grid-template-columns:280px 1fr 360px;
-  gap:18px;
-  padding:18px;
-}}
-
-/* ================= CARD ================= */
-.card {{
-  background:var(--card-bg);
-  border-radius:18px;
-  padding:14px;
-  border:1px solid var(--border);
-  box-shadow:var(--shadow);
-  display:flex;
-  flex-direction:column;
-}}
-
-.card h3 {{
-  margin-bottom:12px;
-  font-size:18px;
-  font-weight:600;
-}}
-
-/* ================= SUBJECTS ================= */
-.folder-title {{
-  padding:12px;
-  border-radius:12px;
-  background:var(--inner-bg);
-  font-weight:600;
-  cursor:pointer;
-  margin-bottom:8px;
-}}
-
-.subject {{
-  margin-top:6px;
-  padding:10px;
-  border-radius:10px;
-  background:var(--inner-bg);
-  cursor:pointer;
-  transition:all 0.2s;
-}}
-
-.subject:hover,
-.subject.active {{
-  background:var(--primary);
-  color:#fff;
-  transform:translateX(4px);
-}}
-
-/* ================= VIDEO PLAYER SECTION ================= */
-#videoPlayer {{
-  flex:1;
-  display:flex;
-  flex-direction:column;
-  min-height:400px;
-}}
-
-#videoPlayerContainer {{
-  flex:1;
-  background:var(--inner-bg);
-  border-radius:14px;
-  overflow:hidden;
-  display:flex;
-  align-items:center;
-  justify-content:center;
-  border:1px solid var(--border);
-  margin-bottom:12px;
-}}
-
-/* Fixed API Player Container - NO SCROLLING */
-.api-player-container {{
-  width:100%;
-  height:100%;
-  min-height:360px;
-  background:#000;
-  position:relative;
-  display:flex;
-  align-items:center;
-  justify-content:center;
-  overflow:hidden !important;
-}}
-
-.api-player-iframe {{
-  width:100%;
-  height:100%;
-  border:none;
-  background:#000;
-  overflow:hidden !important;
-}}
-
-/* PLAYLIST SECTION */
-#playlistContainer {{
-  flex:1;
-  overflow-y:auto;
-  max-height:300px;
-  padding-right:4px;
-}}
-
-.playlist-item {{
-  padding:10px;
-  border-radius:10px;
-  background:var(--inner-bg);
-  cursor:pointer;
-  margin-bottom:6px;
-  transition:all 0.2s;
-  display:flex;
-  align-items:center;
-  gap:8px;
-}}
-
-.playlist-item:before {{
-  content:"▶";
-  font-size:12px;
-  opacity:0.7;
-}}
-
-.playlist-item:hover,
-.playlist-item.active {{
-  background:var(--primary);
-  color:#fff;
-  transform:translateX(4px);
-}}
-
-.playlist-item.active:before {{
-  content:"⏸";
-}}
-
-/* ================= PDF SECTION ================= */
-#pdfContainer {{
-  flex:1;
-  display:flex;
-  flex-direction:column;
-  min-height:400px;
-}}
-
-#pdfList {{
-  flex:1;
-  overflow-y:auto;
-  max-height:350px;
-  padding-right:4px;
-}}
-
-.pdf-item {{
-  padding:10px;
-  border-radius:10px;
-  background:var(--inner-bg);
-  cursor:pointer;
-  margin-bottom:6px;
-  transition:all 0.2s;
-  display:flex;
-  align-items:center;
-  gap:8px;
-}}
-
-.pdf-item:before {{
-  content:"📄";
-  font-size:14px;
-}}
-
-.pdf-item:hover,
-.pdf-item.active {{
-  background:var(--primary);
-  color:#fff;
-  transform:translateX(4px);
-}}
-
-/* ================= RESPONSIVE ================= */
-@media(max-width:900px) {{
-  .container {{
-    grid-template-columns:1fr;
-  }}
-  #videoPlayerContainer {{
-    min-height:300px;
-  }}
-  .api-player-container {{
-    min-height:300px;
-  }}
-}}
-
-@media(max-width:600px) {{
-  #videoPlayerContainer {{
-    min-height:250px;
-  }}
-  .api-player-container {{
-    min-height:250px;
-  }}
-}}
-
-/* Scrollbar Styling */
-::-webkit-scrollbar {{
-  width:6px;
-}}
-
-::-webkit-scrollbar-track {{
-  background:transparent;
-  border-radius:3px;
-}}
-
-::-webkit-scrollbar-thumb {{
-  background:var(--primary);
-  border-radius:3px;
-}}
-
-::-webkit-scrollbar-thumb:hover {{
-  background:var(--primary);
-  opacity:0.8;
-}}
-</style>
-</head>
-
-<body class="light">
-
-<header class="main-header">
-  <div class="title-box">
-    <h1>Engineers Babu</h1>
-    <span>HTML VIEWER</span>
-  </div>
-  <div class="toggle" onclick="toggleTheme()">🌙 / ☀️</div>
-</header>
-
-<div class="gradient-bar"></div>
-
-<div class="search">
-  <input type="text" placeholder="Search subject..." onkeyup="filterSubjects(this.value)">
-</div>
-
-<div class="container">
-
-  <!-- LEFT - SUBJECTS -->
-  <div class="card" id="subjectsCard">
-    <h3>📚 Subjects</h3>
-    <div id="subjects"></div>
-  </div>
-
-  <!-- CENTER - VIDEO PLAYER -->
-  <div class="card" id="videoCard">
-    <h3>🎬 Video Player</h3>
-    <div id="videoPlayer">
-      <div id="videoPlayerContainer">
-        <div class="api-player-container">
-          <iframe class="api-player-iframe" 
-                  id="apiPlayer" 
-                  allowfullscreen
-                  allow="autoplay; encrypted-media; picture-in-picture">
-          </iframe>
-        </div>
-      </div>
-      <div id="playlistContainer">
-        <div id="playlist"></div>
-      </div>
-    </div>
-  </div>
-
-  <!-- RIGHT - PDF LIST -->
-  <div class="card" id="pdfCard">
-    <h3>📄 PDF Files</h3>
-    <div id="pdfContainer">
-      <div id="pdfList"></div>
-      <div style="margin-top:15px; padding:12px; background:var(--inner-bg); border-radius:10px; font-size:14px; color:var(--muted);">
-        <p>📌 <strong>Note:</strong> Click on any PDF to open it in a new tab</p>
-      </div>
-    </div>
-  </div>
-
-</div>
-
-<script>
-/* ================= THEME TOGGLE ================= */
-function toggleTheme() {{
-  document.body.classList.toggle("light");
-  const toggleBtn = document.querySelector('.toggle');
-  toggleBtn.textContent = document.body.classList.contains('light') ? '🌙' : '☀️';
-}}
-
-/* ================= DATA ================= */
-const data = {data_json};
-
-/* ================= VARIABLES ================= */
-let currentVideo = null;
-
-/* ================= SUBJECTS RENDERING ================= */
-function renderSubjects() {{
-  let html = "";
-  data.forEach(f => {{
-    html += `
-      <div class="folder-title" onclick="toggleFolder(this)">
-        📁 ${{f.folder}}
-      </div>
-      <div style="display:none;padding-left:6px;">
-    `;
-    f.subjects.forEach(s => {{
-      html += `<div class="subject" onclick='loadSubject(${{JSON.stringify(s)}},this)'>${{s.name}}</div>`;
-    }});
-    html += `</div>`;
-  }});
-  subjects.innerHTML = html;
-}}
-
-function toggleFolder(element) {{
-  const content = element.nextElementSibling;
-  content.style.display = content.style.display === 'block' ? 'none' : 'block';
-}}
-
-/* ================= LOAD SUBJECT ================= */
-function loadSubject(sub, el) {{
-  // Highlight selected subject
-  document.querySelectorAll(".subject").forEach(x => x.classList.remove("active"));
-  el.classList.add("active");
-  
-  // Load videos if available
-  if (sub.videos && sub.videos.length > 0) {{
-    playVideo(sub.videos[0]);
-    renderPlaylist(sub.videos);
-  }} else {{
-    document.getElementById('apiPlayer').src = '';
-    document.getElementById('playlist').innerHTML = '<div style="padding:20px;text-align:center;color:var(--muted)">No videos available</div>';
-  }}
-  
-  // Load PDFs if available
-  if (sub.pdfs && sub.pdfs.length > 0) {{
-    renderPdfs(sub.pdfs);
-  }} else {{
-    document.getElementById('pdfList').innerHTML = '<div style="padding:20px;text-align:center;color:var(--muted)">No PDFs available</div>';
-  }}
-}}
-
-/* ================= VIDEO PLAYER FUNCTIONS ================= */
-function playVideo(video) {{
-  currentVideo = video;
-  
-  // Set iframe source
-  const apiPlayer = document.getElementById('apiPlayer');
-  apiPlayer.src = video.src;
-  
-  // Highlight the clicked video in playlist
-  highlightPlaylistItem(video);
-  
-  // Scroll video section into view
-  document.getElementById('videoCard').scrollIntoView({{
-    behavior: 'smooth',
-    block: 'start'
-  }});
-}}
-
-function renderPlaylist(videos) {{
-  let html = '';
-  videos.forEach((v, index) => {{
-    html += `
-      <div class="playlist-item" 
-           onclick="playVideo(${{JSON.stringify(v)}})"
-           data-index="${{index}}">
-        <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;">
-          ${{v.title}}
-        </span>
-      </div>
-    `;
-  }});
-  
-  document.getElementById('playlist').innerHTML = html;
-  
-  // Highlight first video
-  if (videos.length > 0) {{
-    highlightPlaylistItem(videos[0]);
-  }}
-}}
-
-function highlightPlaylistItem(video) {{
-  document.querySelectorAll(".playlist-item").forEach(item => {{
-    item.classList.remove("active");
-    const itemVideo = JSON.parse(item.getAttribute('onclick').match(/playVideo\\((.*)\\)/)[1]);
-    if (itemVideo.title === video.title) {{
-      item.classList.add("active");
-    }}
-  }});
-}}
-
-/* ================= PDF FUNCTIONS ================= */
-function renderPdfs(pdfs) {{
-  let html = '';
-  pdfs.forEach((pdf, index) => {{
-    html += `
-      <div class="pdf-item" 
-           onclick="openPdf('${{pdf.full_url || pdf.src}}')"
-           data-index="${{index}}">
-        <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;">
-          ${{pdf.name}}
-        </span>
-      </div>
-    `;
-  }});
-  
-  document.getElementById('pdfList').innerHTML = html;
-}}
-
-function openPdf(url) {{
-  // Open PDF in new tab
-  window.open(url, '_blank');
-}}
-
-/* ================= SEARCH FUNCTION ================= */
-function filterSubjects(val) {{
-  document.querySelectorAll(".subject").forEach(s => {{
-    s.style.display = s.innerText.toLowerCase().includes(val.toLowerCase())
-      ? "block" : "none";
-  }});
-}}
-
-/* ================= KEYBOARD SHORTCUTS ================= */
-document.addEventListener('keydown', function(e) {{
-  // Space to play/pause
-  if (e.code === 'Space' && document.activeElement.tagName !== 'INPUT') {{
-    e.preventDefault();
-    const apiPlayer = document.getElementById('apiPlayer');
-    if (apiPlayer.src) {{
-      apiPlayer.focus();
-    }}
-  }}
-  
-  // F for fullscreen
-  if (e.code === 'KeyF' && document.activeElement.tagName !== 'INPUT') {{
-    e.preventDefault();
-    const apiPlayer = document.getElementById('apiPlayer');
-    if (apiPlayer.src) {{
-      if (apiPlayer.requestFullscreen) {{
-        apiPlayer.requestFullscreen();
-      }}
-    }}
-  }}
-}});
-
-/* ================= INITIALIZATION ================= */
-renderSubjects();
-
-// Auto-load first subject if available
-if (data.length > 0 && data[0].subjects.length > 0) {{
-  setTimeout(() => {{
-    const firstSubject = data[0].subjects[0];
-    const firstSubjectElement = document.querySelector('.subject');
-    if (firstSubjectElement) {{
-      loadSubject(firstSubject, firstSubjectElement);
-    }}
-  }}, 500);
-}}
-</script>
-
-</body>
-</html>'''
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_template)
-    
-    return output_path
+        on_position(position) is awaited when the job's place in line changes, at
+        most once per edit_interval, and never after the slot is granted.
+        """
+        await self._acquire(user, on_position)
+        try:
+            yield
+        finally:
+            self._release(user)
+
+# Per-stage latency and job counters, scraped from the metrics endpoint
+STAGE_SECONDS = metrics.Histogram('bot_stage_seconds', 'Latency of each job stage', ['stage'])
+JOBS = metrics.Counter('bot_jobs_total', 'Documents received for conversion')
+JOB_FAILURES = metrics.Counter('bot_job_failures_total', 'Documents that failed to convert')
+LINES_PARSED = metrics.Counter('bot_lines_parsed_total', 'Catalog lines read by the parser')
+ENTRIES = metrics.Counter('bot_entries_total', 'Videos and PDFs found in catalogs')
+OUTPUT_BYTES = metrics.Counter('bot_output_bytes_total', 'Bytes of HTML generated')
+IN_FLIGHT = metrics.Gauge('bot_jobs_in_flight', 'Documents currently being processed')
+
+catalog_store = CatalogStore(max_entries=CATALOG_MAX_ENTRIES, memory_budget=CATALOG_MEMORY_BUDGET)
+
+# Cached viewers keep their catalog version alive, so a chat they are resent
+# to can append to it like to one it converted itself
+result_cache = ResultCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl=CACHE_TTL,
+    retain=lambda cached: catalog_store.retain(cached['version']),
+    release=lambda cached: catalog_store.release(cached['version'])
+)
+
+scheduler = JobScheduler(
+    max_active=MAX_ACTIVE_JOBS,
+    per_user=MAX_JOBS_PER_USER,
+    max_queued_per_user=MAX_QUEUED_PER_USER,
+    max_queued=MAX_QUEUED_JOBS,
+    edit_interval=QUEUE_EDIT_INTERVAL
+)
+
+worker_pool = WorkerPool(
+    mode=WORKER_MODE,
+    workers=WORKER_COUNT,
+    max_tasks=WORKER_MAX_TASKS,
+    queue_size=WORKER_QUEUE_SIZE
+)
+
+QUEUE_DEPTH = metrics.Gauge(
+    'bot_queue_depth', 'Jobs waiting for admission or a pool worker',
+    func=lambda: scheduler.waiting() + worker_pool.queue_depth()
+)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send welcome message"""
     await update.message.reply_text(
         "👋 Welcome to Engineers Babu HTML Generator Bot!\n\n"
-        "📤 Send me a .txt file with the format:\n"
+        "📤 Send me a .txt file (plain, or as .txt.gz, .bz2 or .zip) with the format:\n"
         "(Category)Title:URL\n\n"
         "Example:\n"
         "(Physics)Lect.-1 Introduction:https://example.com/video1.mp4\n"
         "(Physics)Notes-1 Formulas:https://example.com/notes.pdf\n\n"
-        "I'll generate an HTML viewer with API video player! 🚀"
+        "I'll generate an HTML viewer with API video player! 🚀\n\n"
+        "➕ To add new lectures later, send just the new lines with the caption \"append\"."
+    )
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Report result cache statistics"""
+    stats = result_cache.stats()
+    await update.message.reply_text(
+        f"📊 Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries"
     )
 
+def is_delta_upload(caption):
+    """True when the caption marks the file as new lines for an earlier catalog"""
+    caption = (caption or '').strip().lower()
+    return caption.startswith('+') or caption.startswith('append')
+
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle uploaded document"""
     document = update.message.document
     
-    # Check if it's a txt file
-    if not document.file_name.endswith('.txt'):
-        await update.message.reply_text("❌ Please send a .txt file!")
+    # Check if it's a txt file or a compressed one
+    if upload_format(document.file_name or '') is None:
+        await update.message.reply_text("❌ Please send a .txt file (plain, .txt.gz, .bz2 or .zip)!")
         return
     
-    await update.message.reply_text("⏳ Processing your file...")
+    status = await update.message.reply_text("⏳ Processing your file...")
     
+    delta = is_delta_upload(update.message.caption)
+    
+    JOBS.inc()
+    IN_FLIGHT.inc()
     try:
-        # Download file
-        file = await context.bot.get_file(document.file_id)
-        input_path = f"/tmp/{document.file_name}"
-        await file.download_to_drive(input_path)
-        
-        # Parse the file
-        parsed_data = parse_txt_file(input_path)
-        
-        # Generate HTML
-        output_filename = document.file_name.replace('.txt', '.html')
-        output_path = f"/tmp/{output_filename}"
-        generate_html(parsed_data, output_path)
+        # Resend a stored viewer when this exact upload was converted before
+        cached = None if delta else result_cache.get(document.file_unique_id, final=False)
+        if cached is not None:
+            key = (update.effective_chat.id, upload_format(document.file_name)[0])
+            await resend_cached(update, key, cached)
+            return
         
-        # Count totals
-        total_videos = sum(len(subject['subjects'][0]['videos']) for subject in parsed_data)
-        total_pdfs = sum(len(subject['subjects'][0]['pdfs']) for subject in parsed_data)
+        queued = False
         
-        # Send the generated HTML file
-        with open(output_path, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                filename=output_filename,
-                caption=(
-                    f"✅ **HTML Viewer Generated!**\n\n"
-                    f"📊 **Statistics:**\n"
-                    f"• 📁 Subjects: {len(parsed_data)}\n"
-                    f"• 🎬 Videos: {total_videos}\n"
-                    f"• 📄 PDFs: {total_pdfs}\n\n"
-                    f"**Features:**\n"
-                    f"• 🎯 API Video Player\n"
-                    f"• 📄 PDFs open in new tab\n"
-                    f"• 🔍 Search functionality\n"
-                    f"• 🌙/☀️ Dark/Light theme\n"
-                    f"• 📱 Mobile responsive"
-                )
-            )
+        async def show_position(position):
+            nonlocal queued
+            queued = True
+            await status.edit_text(f"🕒 Queued: position {position}. Your file will be processed soon...")
         
-        # Clean up
-        os.remove(input_path)
-        os.remove(output_path)
+        # Wait for a slot, taking turns with other users
+        async with scheduler.slot(update.effective_user.id, show_position):
+            if queued:
+                await status.edit_text("⏳ Processing your file...")
+            await convert_document(update, context, document, delta)
         
+    except QueueFull as e:
+        await status.edit_text(f"🚦 {e}")
     except Exception as e:
+        JOB_FAILURES.inc()
         logger.error(f"Error processing file: {e}")
         await update.message.reply_text(f"❌ Error processing file: {str(e)[:100]}")
+    finally:
+        IN_FLIGHT.dec()
+
+async def resend_cached(update: Update, key, cached):
+    """Resend a stored viewer, recording its catalog version under key for later updates"""
+    catalog_store.put(key, cached['version'])
+    with STAGE_SECONDS.labels('reply_document').time():
+        await update.message.reply_document(document=cached['file_id'], caption=cached['caption'])
+
+async def convert_document(update: Update, context: ContextTypes.DEFAULT_TYPE, document, delta=False):
+    """Download, convert and send back one document
+    
+    The result is merged into the chat's earlier version of the catalog when the
+    upload is a delta, or when it starts with everything that version was built from.
+    """
+    input_path = output_path = snapshot_path = held = None
+    try:
+        with STAGE_SECONDS.labels('get_file').time():
+            file = await context.bot.get_file(document.file_id)
+        catalog_name, compression = upload_format(document.file_name)
+        
+        if (document.file_size or 0) > SPILL_THRESHOLD:
+            # Large uploads spill to uniquely named temp files
+            input_path = make_temp_path('.txt')
+            with STAGE_SECONDS.labels('download').time():
+                await file.download_to_drive(input_path)
+            content_hash = await asyncio.to_thread(hash_file, input_path)
+        else:
+            # Download, parse and render entirely in memory
+            with STAGE_SECONDS.labels('download').time():
+                raw = bytes(await file.download_as_bytearray())
+            # hashlib releases the GIL, so hashing in a thread keeps the poller responsive
+            content_hash = (await asyncio.to_thread(hashlib.sha256, raw)).hexdigest()
+        
+        source = input_path or raw
+        chat_id = update.effective_chat.id
+        prefix = b''
+        if delta:
+            key, base = catalog_store.find_base(chat_id, catalog_name)
+            if base is None:
+                raise ValueError("No earlier catalog to append to. Send the full .txt first.")
+            # Keep its snapshot readable even if another job replaces it meanwhile
+            held = catalog_store.retain(base)
+            catalog_name = key[1]
+            start = 0
+            if base['tail']:
+                # The earlier upload ended mid-line; that line now ends before the delta
+                prefix = base['tail'].encode('utf-8') + b'\n'
+        else:
+            # Same content forwarded under a different upload id
+            key = (chat_id, catalog_name)
+            cached = result_cache.get(content_hash)
+            if cached is not None:
+                result_cache.put(document.file_unique_id, cached)
+                await resend_cached(update, key, cached)
+                return
+            
+            # A re-upload that only appends lines resumes from the stored version;
+            # compressed uploads are always parsed in full
+            base = held = catalog_store.retain(catalog_store.get(key))
+            start = 0
+            if base is not None and compression is None:
+                size = os.path.getsize(input_path) if input_path else len(raw)
+                start = await asyncio.to_thread(shared_prefix, source, size, base)
+            if not start:
+                base = None
+        
+        previous = base['snapshot'] if base else None
+        tail = base['tail'] if delta else ''
+        if input_path or isinstance(previous, str):
+            # Large catalogs keep their snapshot on disk, like their upload
+            snapshot_path = make_temp_path('.catalog')
+        if input_path:
+            output_path = make_temp_path('.html')
+            _, snapshot, stats = await worker_pool.run(
+                update_catalog, input_path, previous, start, tail, output_path, compression, snapshot_path
+            )
+            output = open(output_path, 'rb')
+        else:
+            html, snapshot, stats = await worker_pool.run(
+                update_catalog, raw[start:] if start else raw, previous, 0, tail, None, compression, snapshot_path
+            )
+            output = io.BytesIO(html)
+        
+        # Remember this version so the next upload only parses what is new
+        if stats['consumed'] is None or (base is not None and not base['segments']):
+            # Decompressed bytes aren't kept, so only delta uploads can build on it
+            segments, digest = [], b''
+        else:
+            digest = await asyncio.to_thread(
+                extend_digest, base['digest'] if base else b'', source, start, stats['consumed'], prefix
+            )
+            segments = (base['segments'] if base else []) + [len(prefix) + stats['consumed']]
+        version = {
+            'snapshot': snapshot_path or snapshot,
+            'segments': segments,
+            'digest': digest,
+            'tail': stats['tail'],
+            'refs': 0
+        }
+        catalog_store.put(key, version)
+        snapshot_path = None
+        
+        # Parse and render are timed inside the worker
+        STAGE_SECONDS.labels('parse').observe(stats['parse_seconds'])
+        STAGE_SECONDS.labels('render').observe(stats['render_seconds'])
+        LINES_PARSED.inc(stats['lines'])
+        ENTRIES.inc(stats['videos'] + stats['pdfs'])
+        OUTPUT_BYTES.inc(stats['output_bytes'])
+        
+        # Send the generated HTML file, or the zip bundle for very large catalogs
+        output_filename = catalog_name + ('.zip' if stats.get('bundle_files') else '.html')
+        caption = build_caption(stats)
+        with output, STAGE_SECONDS.labels('reply_document').time():
+            sent = await update.message.reply_document(
+                document=output,
+                filename=output_filename,
+                caption=caption
+            )
+        
+        # Remember the uploaded file_id so repeats skip parse, render and upload;
+        # a delta's output depends on the earlier version, so it is never reused
+        if not delta:
+            if stats['incremental']:
+                # Other chats get this viewer as a whole, so leave out what only described this run
+                caption = build_caption(dict(stats, incremental=False, duplicates=0))
+            cached = {'file_id': sent.document.file_id, 'caption': caption, 'version': version}
+            result_cache.put(document.file_unique_id, cached)
+            result_cache.put(content_hash, cached)
+    finally:
+        catalog_store.release(held)
+        # Clean up spilled files even when processing fails
+        for path in (input_path, output_path, snapshot_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+async def start_workers(application: Application):
+    """Warm up the worker pool before updates arrive"""
+    await worker_pool.start()
+    logger.info(f"⚙️ {worker_pool.workers} {worker_pool.mode} workers ready, up to {scheduler.max_active} jobs at once")
+
+async def shutdown_workers(application: Application):
+    """Stop the worker pool and drop catalog snapshots when the bot shuts down"""
+    worker_pool.shutdown()
+    result_cache.clear()
+    catalog_store.clear()
 
 def main():
     """Start the bot"""
@@ -751,12 +798,32 @@ def main():
     
     try:
         # Create application
-        application = Application.builder().token(BOT_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .concurrent_updates(True)  # let uploads run side by side in the worker pool
+            .post_init(start_workers)
+            .post_shutdown(shutdown_workers)
+        )
+        if BOT_API_URL:
+            # Self-hosted or fake Bot API server
+            builder = builder.base_url(f"{BOT_API_URL}/bot").base_file_url(f"{BOT_API_URL}/file/bot")
+        application = builder.build()
         
         # Add handlers
         application.add_handler(CommandHandler("start", start))
+        application.add_handler(CommandHandler("stats", show_stats))
         application.add_handler(MessageHandler(filters.Document.ALL, handle_document))
         
+        # Serve job metrics next to the polling loop
+        if METRICS_PORT:
+            try:
+                metrics.start_http_server(METRICS_PORT, METRICS_HOST)
+                logger.info(f"📈 Metrics at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                # A busy port costs the metrics, not the bot
+                logger.warning(f"Metrics disabled, cannot listen on {METRICS_HOST}:{METRICS_PORT}: {e}")
+        
         # Start the bot
         logger.info("🤖 Bot started! Send /start to begin.")
         print("=" * 50)
@@ -766,12 +833,34 @@ def main():
         print("Send /start to begin")
         print("=" * 50)
         
-        application.run_polling(
-            allowed_updates=Update.ALL_TYPES,
-            drop_pending_updates=True
-        )
+        run_transport(application)
     except Exception as e:
         logger.error(f"Failed to start bot: {e}")
 
+def run_transport(application):
+    """Receive updates through the webhook when configured, otherwise by polling"""
+    if WEBHOOK_URL:
+        try:
+            logger.info(f"🌐 Webhook mode on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True,
+                close_loop=False
+            )
+            return
+        except Exception as e:
+            # e.g. webhook extras not installed, port in use or setWebhook refused
+            logger.error(f"Webhook mode failed ({e}); falling back to polling")
+    
+    application.run_polling(
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=True
+    )
+
 if __name__ == '__main__':
     main()